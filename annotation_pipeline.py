@@ -0,0 +1,224 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from annotation_plan import plan_annotations
+from clinvar_parser import fetch_gnomad_batch, GNOMAD_BATCH_SIZE, GNOMAD_NO_DATA
+from metrics import metrics
+from gemini_handler import generate_with_gemini, generate_batch_with_gemini
+from pubmed_handler import get_pubmed_ids_batch, build_pubmed_links, ELINK_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Servis başına eşzamanlı istek sınırı (istek hızı sınırları handler'larda uygulanır)
+DEFAULT_CONCURRENCY = {"pubmed": 2, "gnomad": 4, "gemini": 4}
+
+_PENDING = object()
+
+
+def build_prompt(row, pmids, stats):
+    """Varyant ve anotasyon verilerinden Gemini prompt'unu oluşturur."""
+    return f"""
+You are a clinical geneticist. Based on the following variant and annotation data, provide a professional clinical interpretation.
+
+🧬 Variant:
+- Chr: {row['CHROM']}, Pos: {row['POS']}, {row['REF']}→{row['ALT']}
+
+📑 ClinVar:
+- Gene: {row.get('GENE','N/A')}, Sig: {row.get('CLNSIG','N/A')}, Dis: {row.get('DISEASE','N/A')}
+
+🧪 ClinGen Validity: {row.get('ClinGen_Validity','N/A')}
+- Curations: {row.get('ClinGen_Curations','N/A')}
+
+📚 PubMed: {', '.join(pmids) if pmids else 'None'}
+
+📊 gnomAD:
+- Exome AC/AN: {stats.get('Exome_AC','N/A')}/{stats.get('Exome_AN','N/A')}
+- PopMax AF: {stats.get('PopMax_AF','N/A')} (Pop: {stats.get('PopMax_Pop','N/A')})
+
+🩺 Answer:
+1. Likely pathogenicity?
+2. Known disease?
+3. Clinical relevance?
+4. Plain-language summary (≤5 sents).
+"""
+
+
+def _is_error(value):
+    return isinstance(value, dict) and "error" in value
+
+
+def _call_batch(stage, fn, items):
+    start = time.perf_counter()
+    try:
+        result = fn(items)
+    except Exception as e:
+        logger.error(f"{getattr(fn, '__name__', fn)} failed: {e}")
+        result = {'error': f"Unexpected error: {e}"}
+    if isinstance(result, dict):
+        result = [result] * len(items)
+    # Hata sayısı, hata döndüren öğe sayısıdır (gnomAD'da kaydı olmamak hata değildir)
+    metrics.observe(stage, time.perf_counter() - start, items=len(items))
+    metrics.record_error(stage, sum(_is_error(r) and r["error"] != GNOMAD_NO_DATA for r in result))
+    return result
+
+
+def _interpret_failed(answer):
+    return str(answer).startswith(("❌", "🛑"))
+
+
+def iter_annotations(rows, api_key=None, fetch_pubmed=get_pubmed_ids_batch,
+                     fetch_gnomad=fetch_gnomad_batch, interpret=generate_with_gemini,
+                     concurrency=None, pubmed_batch_size=ELINK_BATCH_SIZE,
+                     gnomad_batch_size=GNOMAD_BATCH_SIZE, interpret_batch=generate_batch_with_gemini,
+                     gemini_batch_size=1, plan=None):
+    """
+    Her varyant için PubMed, gnomAD ve Gemini çağrılarını servis başına ayrı
+    iş parçacığı havuzlarında eşzamanlı yürütür.
+    PubMed ve gnomAD paralel çalışır; ikisi bitince Gemini'ye geçilir.
+    Her iki servis de toplu çağrılır: `fetch_pubmed` Variation ID listesi,
+    `fetch_gnomad` (CHROM, POS, REF, ALT) listesi alıp aynı sırada sonuç listesi döndürür.
+    `gemini_batch_size` > 1 ise hazır varyantlar bu boyutta gruplanıp
+    `interpret_batch` ile tek istekte yorumlatılır.
+    `interpret=None` verilirse LLM aşaması atlanır.
+
+    Çağrılar satır başına değil, plan_annotations ile çıkarılan tekil işler
+    başına yapılır (PubMed: Variation ID, gnomAD: varyant anahtarı, Gemini:
+    anahtar + ID); sonuçlar aynı işe düşen tüm satırlara dağıtılır.
+    `plan` önceden hesaplanmışsa (aynı `rows` için) yeniden kullanılır.
+
+    Sonuçlar tamamlandıkça (konum, sonuç, uyarılar) olarak üretilir;
+    son tablodaki sıra için `konum` kullanılmalıdır.
+    """
+    rows = list(rows)
+    plan = plan or plan_annotations(rows)
+    units = plan["units"]
+    # Her tekil ID/anahtar sonucu, ona bağlı birimlere dağıtılır
+    dependents = ([[] for _ in plan["ids"]], [[] for _ in plan["keys"]])
+    for unit, (id_index, key_index) in enumerate(zip(plan["unit_id"], plan["unit_key"])):
+        dependents[0][id_index].append(unit)
+        dependents[1][key_index].append(unit)
+
+    limits = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+    pools = {
+        name: ThreadPoolExecutor(max_workers=max(1, limits[name]), thread_name_prefix=name)
+        for name in ("pubmed", "gnomad", "gemini")
+    }
+    done = queue.Queue()
+    lock = threading.Lock()
+    pending = {}
+    fetched = {}
+    ready = []
+    batched = interpret is not None and interpret_batch is not None and gemini_batch_size > 1
+
+    def prepare(unit):
+        row = units[unit]
+        pm_response, gnomad_response = fetched.pop(unit)
+        warnings = []
+
+        if _is_error(pm_response):
+            warnings.append(f"⚠️ PubMed fetch error for ID {row['ID']}: {pm_response['error']}")
+            pmids = []
+        else:
+            pmids = pm_response
+
+        if _is_error(gnomad_response):
+            warnings.append(
+                f"⚠️ gnomAD fetch error for variant {row['CHROM']}-{row['POS']}-{row['REF']}-{row['ALT']}: "
+                f"{gnomad_response['error']}"
+            )
+            stats = {}
+        else:
+            stats = gnomad_response
+
+        annotations = {"PubMed_Links": ", ".join(build_pubmed_links(pmids)), **stats}
+        return annotations, build_prompt(row, pmids, stats), warnings
+
+    def finish(unit):
+        annotations, prompt, warnings = prepare(unit)
+        if interpret is not None:
+            start = time.perf_counter()
+            try:
+                annotations["Gemini_Yorum"] = interpret(prompt, api_key=api_key)
+            except Exception as e:
+                annotations["Gemini_Yorum"] = f"❌ {e}"
+            metrics.observe("gemini", time.perf_counter() - start)
+            metrics.record_error("gemini", int(_interpret_failed(annotations["Gemini_Yorum"])))
+        done.put((unit, annotations, warnings))
+
+    def finish_batch(batch):
+        prepared = [prepare(unit) for unit in batch]
+        start = time.perf_counter()
+        try:
+            answers = interpret_batch([prompt for _, prompt, _ in prepared], api_key=api_key,
+                                      batch_size=len(batch))
+        except Exception as e:
+            answers = [f"❌ {e}"] * len(batch)
+        metrics.observe("gemini", time.perf_counter() - start, items=len(batch))
+        metrics.record_error("gemini", sum(map(_interpret_failed, answers)))
+        for unit, (annotations, _, warnings), answer in zip(batch, prepared, answers):
+            annotations["Gemini_Yorum"] = answer
+            done.put((unit, annotations, warnings))
+
+    def on_fetched(unit, slot, value):
+        with lock:
+            pending[unit][slot] = value
+            if _PENDING in pending[unit]:
+                return
+            fetched[unit] = pending.pop(unit)
+            if batched:
+                ready.append(unit)
+                if len(ready) < gemini_batch_size and pending:
+                    return
+                flush = ready[:]
+                ready.clear()
+        if batched:
+            pools["gemini"].submit(finish_batch, flush)
+        elif interpret is not None:
+            pools["gemini"].submit(finish, unit)
+        else:
+            finish(unit)
+
+    def on_batch(slot, indices, future):
+        if future.cancelled():
+            return
+        for i, value in zip(indices, future.result()):
+            for unit in dependents[slot][i]:
+                on_fetched(unit, slot, value)
+
+    def submit_batches(slot, pool, fn, batch_size, items):
+        step = max(1, batch_size)
+        for start in range(0, len(items), step):
+            indices = list(range(start, min(start + step, len(items))))
+            future = pools[pool].submit(_call_batch, pool, fn, [items[i] for i in indices])
+            future.add_done_callback(lambda f, ix=indices: on_batch(slot, ix, f))
+
+    try:
+        for unit in range(len(units)):
+            pending[unit] = [_PENDING, _PENDING]
+        submit_batches(0, "pubmed", fetch_pubmed, pubmed_batch_size, plan["ids"])
+        submit_batches(1, "gnomad", fetch_gnomad, gnomad_batch_size, plan["keys"])
+
+        for _ in range(len(units)):
+            unit, annotations, warnings = done.get()
+            for pos in plan["unit_rows"][unit]:
+                yield pos, {**rows[pos], **annotations}, warnings
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def annotate_variants(rows, api_key=None, **kwargs):
+    """`iter_annotations` sonuçlarını giriş sırasına göre liste olarak döndürür."""
+    rows = list(rows)
+    results = [None] * len(rows)
+    shown = set()
+    for pos, result, warnings in iter_annotations(rows, api_key, **kwargs):
+        for w in warnings:
+            if w not in shown:
+                shown.add(w)
+                logger.warning(w)
+        results[pos] = result
+    return results
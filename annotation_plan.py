@@ -0,0 +1,90 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ["CHROM", "POS", "REF", "ALT"]
+
+
+def variant_key(row):
+    return str(row["CHROM"]), int(row["POS"]), str(row["REF"]), str(row["ALT"])
+
+
+def variation_id(row):
+    return str(int(row["ID"]))
+
+
+def plan_annotations(rows):
+    """
+    Dış servis çağrılarından önce satırları tekil işlere indirger:
+    - PubMed: tekil ClinVar Variation ID başına bir sorgu
+    - gnomAD: tekil (CHROM, POS, REF, ALT) anahtarı başına bir sorgu
+    - Gemini: tekil (anahtar, Variation ID) birimi başına bir yorum; aynı
+      birimdeki satırların prompt'u aynıdır
+    Dönüş: {
+      "units": birim başına temsilci satır,
+      "unit_rows": birim başına satır konumları,
+      "ids", "unit_id": tekil ID'ler ve birimin ID indeksi,
+      "keys", "unit_key": tekil anahtarlar ve birimin anahtar indeksi,
+      "stats": {"rows", "units", "ids", "keys"}
+    }
+    """
+    rows = list(rows)
+    ids, keys, units = {}, {}, {}
+    plan = {"units": [], "unit_rows": [], "unit_id": [], "unit_key": []}
+    for pos, row in enumerate(rows):
+        vid, key = variation_id(row), variant_key(row)
+        unit = units.get((key, vid))
+        if unit is None:
+            unit = units[(key, vid)] = len(plan["units"])
+            plan["units"].append(row)
+            plan["unit_rows"].append([])
+            plan["unit_id"].append(ids.setdefault(vid, len(ids)))
+            plan["unit_key"].append(keys.setdefault(key, len(keys)))
+        plan["unit_rows"][unit].append(pos)
+    plan["ids"] = list(ids)
+    plan["keys"] = list(keys)
+    plan["stats"] = {"rows": len(rows), "units": len(units), "ids": len(ids), "keys": len(keys)}
+    if len(units) < len(rows):
+        logger.info(f"Planned {len(units)} unique lookups for {len(rows)} rows "
+                    f"({len(ids)} Variation IDs, {len(keys)} variants)")
+    return plan
+
+
+def gene_summary(df):
+    """
+    Gen başına özet: tekil varyant ve satır sayısı, en güçlü ClinGen sınıfı
+    ve CLNSIG sınıflarına göre tekil varyant sayıları (sütun başına bir sınıf).
+    """
+    if df.empty or "GENE" not in df.columns:
+        return pd.DataFrame(columns=["GENE", "variants", "rows"])
+    data = df.assign(
+        GENE=df["GENE"].astype(object).where(df["GENE"].notna(), "-"),
+        _key=pd.util.hash_pandas_object(df[KEY_COLUMNS].astype(str), index=False).to_numpy(),
+    )
+    summary = data.groupby("GENE", sort=True).agg(variants=("_key", "nunique"), rows=("_key", "size"))
+    if "ClinGen_Validity" in data.columns:
+        summary["ClinGen_Validity"] = data.groupby("GENE")["ClinGen_Validity"].first()
+    if "CLNSIG" in data.columns:
+        clnsig = data.assign(CLNSIG=data["CLNSIG"].astype(object).where(data["CLNSIG"].notna(), "-"))
+        counts = clnsig.drop_duplicates(["GENE", "_key", "CLNSIG"]).pivot_table(
+            index="GENE", columns="CLNSIG", values="_key", aggfunc="size", fill_value=0
+        )
+        summary = summary.join(counts)
+    summary = summary.sort_values(["variants", "rows"], ascending=False)
+    return summary.reset_index()
+
+
+def clingen_summary(df):
+    """ClinGen sınıfı başına gen, tekil varyant ve satır sayıları."""
+    if df.empty or "ClinGen_Validity" not in df.columns:
+        return pd.DataFrame(columns=["ClinGen_Validity", "genes", "variants", "rows"])
+    data = df.assign(
+        ClinGen_Validity=df["ClinGen_Validity"].astype(object).where(df["ClinGen_Validity"].notna(), "Yok"),
+        _key=pd.util.hash_pandas_object(df[KEY_COLUMNS].astype(str), index=False).to_numpy(),
+    )
+    summary = data.groupby("ClinGen_Validity").agg(
+        genes=("GENE", "nunique"), variants=("_key", "nunique"), rows=("_key", "size")
+    )
+    return summary.sort_values("variants", ascending=False).reset_index()
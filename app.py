@@ -1,16 +1,23 @@
 import os
+import time
 import streamlit as st
 from streamlit_option_menu import option_menu
 import pandas as pd
-import gzip, io, time
 
 from functools import lru_cache
 
 
-from clinvar_parser import enrich_clinvar_df, add_gnomad_links, fetch_gnomad_simple
-from gemini_handler import generate_with_gemini
-from clingen_handler import load_clingen_validity, get_clingen_classification
-from pubmed_handler import get_pubmed_ids_from_clinvar, build_pubmed_links
+from annotation_pipeline import iter_annotations
+from checkpoint import RunCheckpoint, make_run_id, iter_checkpointed
+from gemini_handler import GEMINI_MODEL
+from reference_data import read_variants, match_variants
+from shared_resources import get_shared_resources
+from metrics import metrics, STAGES
+from variant_filter import filter_variants, BENIGN_CLNSIG, FILTER_COLUMN
+from regions import resolve_panel
+from result_buffer import ResultBuffer
+from annotation_plan import plan_annotations, gene_summary, clingen_summary
+from clingen_handler import CLASSIFICATION_ORDER
 
 # Sayfa yapılandırması
 st.set_page_config(page_title="Genetik App", layout="wide")
@@ -43,55 +50,107 @@ if selected == "Dokümantasyon":
     show_documentation()   # burada dokümantasyon modülündeki fonksiyonu çalıştırır
 
 
-# Cache’lenmiş fonksiyonlar
-# TTL: 24 saat (saniye cinsinden)
-@st.cache_data(ttl=24 * 3600, show_spinner=False)
-def get_pubmed_ids_cached(variation_id: str):
-    return get_pubmed_ids_from_clinvar(variation_id)
-
-@st.cache_data(ttl=24 * 3600, show_spinner=False)
-def fetch_gnomad_cached(chrom: str, pos: str, ref: str, alt: str):
-    return fetch_gnomad_simple(chrom, pos, ref, alt)
-# -----------------------------
-
-
 # ClinVar + ClinGen setup
-clinvar_df = enrich_clinvar_df(pd.read_parquet("sampled_100.parquet"))
-clinvar_df = add_gnomad_links(clinvar_df, genome_build="GRCh38")
-clingen_df = load_clingen_validity("Clingen-Gene-Disease-Summary-2025-07-01.csv")
-
-def parse_vcf_gz(uploaded_file):
-    """Tüm veri satırlarını okur."""
-    rows = []
-    with gzip.open(io.BytesIO(uploaded_file.read()), 'rt') as f:
-        for line in f:
-            if line.startswith("#"):
-                continue
-            p = line.strip().split("\t")
-            rows.append({
-                "CHROM": p[0],
-                "POS": int(p[1]),
-                "REF": p[3],
-                "ALT": p[4]
-            })
-    return pd.DataFrame(rows)
-
-
-def parse_vcf(uploaded_file):
-    """Tüm veri satırlarını okur."""
-    content = uploaded_file.getvalue().decode().splitlines()
-    rows = []
-    for line in content:
-        if line.startswith("#"):
-            continue
-        p = line.strip().split("\t")
-        rows.append({
-            "CHROM": p[0],
-            "POS": int(p[1]),
-            "REF": p[3],
-            "ALT": p[4]
-        })
-    return pd.DataFrame(rows)
+@st.cache_resource(show_spinner="📦 Referans veriler yükleniyor...")
+def get_reference_data():
+    # Referans veriler ve API önbellekleri süreç başına bir kez yüklenir;
+    # script tekrarları ve yeni oturumlar aynı nesneleri kopyalamadan kullanır
+    return get_shared_resources()
+
+
+shared = get_reference_data()
+clinvar_df, clinvar_index, clingen_index = shared.reference
+
+
+def api_cache_counts():
+    """Harici API önbelleklerinin (süreç içi) isabet/ıska sayaçları."""
+    return shared.cache_counts()
+
+def show_metrics_panel():
+    """Aşama başına gecikme, hata, verim ve önbellek isabet oranlarını gösterir."""
+    with st.expander("⏱️ Performans ölçümleri"):
+        snap = metrics.snapshot()
+        stages = sorted(snap["stages"].items(),
+                        key=lambda kv: STAGES.index(kv[0]) if kv[0] in STAGES else len(STAGES))
+        st.dataframe(pd.DataFrame([
+            {
+                "Aşama": name,
+                "Çağrı": s["count"],
+                "Öğe": s["items"],
+                "Hata": s["errors"],
+                "Toplam (sn)": round(s["seconds"], 3),
+                "Ort. (ms)": round(s["mean"] * 1000, 1),
+                "p50 (ms)": round(s["p50"] * 1000, 1),
+                "p95 (ms)": round(s["p95"] * 1000, 1),
+                "Öğe/sn": round(s["items_per_sec"], 1),
+            }
+            for name, s in stages
+        ]), hide_index=True)
+        if snap["caches"]:
+            st.dataframe(pd.DataFrame([
+                {"Önbellek": name, "İsabet": c["hits"], "Iska": c["misses"],
+                 "İsabet oranı": f"{c['hit_rate']:.0%}"}
+                for name, c in snap["caches"].items()
+            ]), hide_index=True)
+        col_json, col_prom, col_reset = st.columns(3)
+        col_json.download_button("⬇️ JSON", metrics.to_json(), file_name="metrics.json",
+                                  mime="application/json")
+        col_prom.download_button("⬇️ Prometheus", metrics.to_prometheus(), file_name="metrics.prom",
+                                 mime="text/plain")
+        if col_reset.button("♻️ Sıfırla"):
+            metrics.reset()
+
+# Sonuç tablosu: canlı yenileme aralığı, Gemini önizleme uzunluğu ve sayfa boyutu
+TABLE_REFRESH_SECONDS = 1.0
+GEMINI_PREVIEW_CHARS = 120
+GEMINI_PAGE_SIZE = 10
+
+
+def results_preview(df):
+    """Tablo görünümü için sonuçlar; uzun Gemini yorumları kısaltılır."""
+    if "Gemini_Yorum" in df.columns:
+        text = df["Gemini_Yorum"].astype("str")
+        df = df.assign(Gemini_Yorum=text.where(text.str.len() <= GEMINI_PREVIEW_CHARS,
+                                               text.str.slice(0, GEMINI_PREVIEW_CHARS) + "…"))
+    return df
+
+
+def show_results(buffer, run_id):
+    """Sonuç tablosu, indirme düğmeleri ve sayfalanmış Gemini yorumları."""
+    st.subheader("📊 Sonuçlar")
+    df = buffer.to_pandas()
+    with metrics.timer("render", items=len(buffer)):
+        st.dataframe(results_preview(df))
+
+    with st.expander("🧬 Gen özeti"):
+        st.markdown("**Gen başına varyantlar (CLNSIG sınıflarına göre)**")
+        st.dataframe(gene_summary(df), hide_index=True)
+        st.markdown("**ClinGen sınıflarına göre**")
+        st.dataframe(clingen_summary(df), hide_index=True)
+
+    col_parquet, col_csv = st.columns(2)
+    col_parquet.download_button("⬇️ Parquet", buffer.to_parquet_bytes(),
+                                file_name=f"results-{run_id}.parquet",
+                                mime="application/octet-stream")
+    col_csv.download_button("⬇️ CSV", buffer.to_csv_bytes(), file_name=f"results-{run_id}.csv",
+                            mime="text/csv")
+
+    table = buffer.to_table()
+    if "Gemini_Yorum" not in table.column_names or not len(buffer):
+        return
+    st.markdown("#### 🧠 Gemini yorumları")
+    n_pages = (len(buffer) - 1) // GEMINI_PAGE_SIZE + 1
+    page = st.number_input("Sayfa", min_value=1, max_value=n_pages, value=1, key=f"page-{run_id}")
+    rows = buffer.page((page - 1) * GEMINI_PAGE_SIZE, GEMINI_PAGE_SIZE,
+                       ["CHROM", "POS", "REF", "ALT", "GENE", "Gemini_Yorum", FILTER_COLUMN])
+    for row in rows.to_dict("records"):
+        with st.expander(f"{row['CHROM']}:{row['POS']} {row['REF']}>{row['ALT']} "
+                         f"{row.get('GENE') or ''}"):
+            if isinstance(row["Gemini_Yorum"], str):
+                st.markdown(row["Gemini_Yorum"])
+            else:
+                st.caption(f"Ön filtre ile elendi ({row.get(FILTER_COLUMN)}); yorumlanmadı.")
+    st.caption(f"Sayfa {page}/{n_pages}")
 
 # Streamlit UI
 st.set_page_config(page_title="Genetik Varyant Yorumlama", layout="wide")
@@ -103,23 +162,58 @@ api_key = st.text_input(
     help="Kendi anahtarınızı buraya yapıştırın"
 )
 
+gemini_batch_size = st.number_input(
+    "Gemini toplu istek boyutu",
+    min_value=1, max_value=20, value=1,
+    help="1'den büyükse bu kadar varyant tek bir Gemini isteğinde yorumlatılır"
+)
+
+# Dış servis çağrılarından önce uygulanan ön filtre
+with st.sidebar.expander("🔬 Ön filtre", expanded=False):
+    exclude_clnsig = st.multiselect(
+        "Elenecek ClinVar sınıfları",
+        BENIGN_CLNSIG + ["Uncertain significance", "Conflicting classifications of pathogenicity"],
+        default=BENIGN_CLNSIG,
+    )
+    min_stars = st.slider("En az inceleme yıldızı (CLNREVSTAT)", 0, 4, 0)
+    clingen_classes = st.multiselect(
+        "Yalnızca bu ClinGen sınıfları (boş: hepsi)", CLASSIFICATION_ORDER + ["Yok"]
+    )
+    use_af_filter = st.checkbox("Yaygın varyantları ele (önbellekteki gnomAD AF)")
+    max_af = st.number_input("En yüksek PopMax AF", min_value=0.0, max_value=1.0, value=0.01,
+                             step=0.001, format="%.4f", disabled=not use_af_filter)
+filter_options = {
+    "exclude_clnsig": exclude_clnsig,
+    "min_stars": min_stars,
+    "clingen_classes": clingen_classes or None,
+    "max_af": max_af if use_af_filter else None,
+}
+
+# Yalnızca bir gen paneli / BED bölgeleri analiz edilebilir
+with st.sidebar.expander("🎯 Gen paneli / bölgeler", expanded=False):
+    panel_text = st.text_area("Genler (virgül veya satırla ayrılmış)", placeholder="BRCA1, BRCA2, TP53")
+    bed_file = st.file_uploader("BED dosyası", type=["bed"])
+panel_genes = [g for g in panel_text.replace(",", "\n").split() if g]
+
 if not api_key:
     st.warning("API anahtarı girilmedi; yorumlama yapamazsınız.")
     st.stop()
 
 uploaded = st.file_uploader("📁 Dosya yükle (.vcf/.vcf.gz/.csv)", type=["vcf","vcf.gz","csv"])
+index_file = st.file_uploader(
+    "🗂️ İsteğe bağlı: tabix indeksi (.tbi/.csi)", type=["tbi", "csi"],
+    help="bgzip'li VCF.gz ve gen paneli/BED ile birlikte verilirse yalnızca ilgili bölgeler okunur",
+)
+
+panel_regions, missing_genes = resolve_panel(clinvar_df, genes=panel_genes, bed=bed_file,
+                                              spans=shared.gene_spans)
+if missing_genes:
+    st.warning(f"ClinVar'da bulunamayan genler: {', '.join(missing_genes)}")
 
 if uploaded:
-    if uploaded.name.endswith(".vcf.gz"):
-        df = parse_vcf_gz(uploaded)
-    elif uploaded.name.endswith(".vcf"):
-        df = parse_vcf(uploaded)
-    else:
-        df = pd.read_csv(uploaded)
-
-    # --- BURAYA EKLEYİN ---
-    required_cols = {"CHROM", "POS", "REF", "ALT"}
-    if not required_cols.issubset(df.columns):
+    try:
+        df = read_variants(uploaded, name=uploaded.name, regions=panel_regions, index=index_file)
+    except ValueError:
         st.error(
             "❌ Yüklenen dosya gerekli sütunları içermiyor:\n"
             "- CHROM\n"
@@ -130,85 +224,135 @@ if uploaded:
         )
         st.stop()
 
+    parse_stats = df.attrs.get("parse_stats")
+    if parse_stats:
+        st.caption(
+            f"📄 {parse_stats.get('records', 0)} kayıt okundu "
+            f"({parse_stats.get('records_per_sec', 0):,.0f} kayıt/sn)"
+            + (f", {parse_stats['blocks_read']} BGZF bloğu açıldı" if "blocks_read" in parse_stats else "")
+        )
+    if panel_regions is not None:
+        st.caption(f"🎯 Panel: {len(panel_regions)} bölge, {len(df)} varyant")
+
+    # İndeks üzerinden ClinVar eşleştirmesi ve ClinGen sütunları
+    _, matched = match_variants(df, clinvar_df, clinvar_index, clingen_index)
+    # Bilgi vermeyen varyantlar PubMed/gnomAD/Gemini'ye gönderilmez
+    annotated, filter_report = filter_variants(matched, **filter_options)
+
+    # Aynı satırlar ve ayarlar için yarıda kalan çalıştırma kaldığı yerden sürdürülür;
+    # kimlik filtre sonrası satırlardan hesaplanır (AF filtresi önbelleğe bağlıdır)
+    run_id = make_run_id(annotated, llm=True, model=GEMINI_MODEL, filters=filter_options)
+    # Her yeniden çizimde çalışır: yalnızca var olan checkpoint okunur, yeni dosya
+    # düğmeye basılınca oluşturulur
+    n_done, partial = 0, None
+    previous = RunCheckpoint.existing(run_id)
+    if previous is not None:
+        try:
+            n_done = previous.count()
+            if n_done:
+                partial = previous.to_frame()
+        finally:
+            previous.close()
+    if n_done:
+        st.info(f"⏯️ Bu dosya için önceki çalıştırmadan {n_done} varyant sonucu bulundu; "
+                "yorumlama kaldığı yerden devam edecek.")
+        st.download_button(
+            "⬇️ Kısmi sonuçları indir (CSV)",
+            partial.to_csv(index=False),
+            file_name=f"partial-{run_id}.csv",
+            mime="text/csv",
+        )
+
     if st.button("🔎 Gemini ile Yorumla"):
         if not api_key:
             st.error("❌ Lütfen önce sidebar’dan API anahtarınızı girin.")
             st.stop()
         with st.spinner("🧠 Gemini yorumluyor..."):
-            # Tip dönüşümleri ve merge
-            for c in ["CHROM","POS","REF","ALT"]:
-                df[c]=df[c].astype(str); clinvar_df[c]=clinvar_df[c].astype(str)
-            merged = pd.merge(df, clinvar_df, on=["CHROM","POS","REF","ALT"], how="left")
-            merged["ClinGen_Validity"] = merged["GENE"].apply(lambda g: get_clingen_classification(g, clingen_df))
-            matched = merged[~merged["ID"].isna()].copy()
-
             st.write(f"✅ Eşleşen varyant sayısı: {len(matched)}")
             st.dataframe(matched.head(30))
 
+            if filter_report["removed"]:
+                saved = filter_report["saved_calls"]
+                st.info(
+                    f"🔬 Ön filtre {filter_report['removed']}/{filter_report['input']} varyantı eledi "
+                    f"({', '.join(f'{k}: {v}' for k, v in filter_report['removed_by'].items() if v)}). "
+                    f"Atlanan sorgular — PubMed: {saved['pubmed']}, gnomAD: {saved['gnomad']}, "
+                    f"Gemini: {saved['gemini']}. Elenen varyantlar sonuçlarda "
+                    f"'{FILTER_COLUMN}' sütunuyla işaretli olarak yer alır."
+                )
+
             status = st.empty()
             overall_pb = st.progress(0)
-            total = len(matched)
-
-            results=[]
-            for i, row in matched.iterrows():
-                idx = i + 1
-
-                status.markdown(f"### 🔍 Processing variant {idx}/{total}:  "
-                    f"{row['CHROM']}:{row['POS']} {row['REF']}>{row['ALT']}")
-
-                # PubMed (cache’li)
-                pm_response = get_pubmed_ids_cached(str(int(row["ID"])))
-
-                if isinstance(pm_response, dict) and "error" in pm_response:
-                    st.warning(f"⚠️ PubMed fetch error for ID {row['ID']}: {pm_response['error']}")
-                    pmids = []
-                else:
-                    pmids = pm_response
-
-                gnomad_response = fetch_gnomad_cached(row["CHROM"], row["POS"], row["REF"], row["ALT"])
-                if isinstance(gnomad_response, dict) and "error" in gnomad_response:
-                    st.warning(f"⚠️ gnomAD fetch error for variant {row['CHROM']}-{row['POS']}-{row['REF']}-{row['ALT']}: {gnomad_response['error']}")
-                    stats = {}
-                else:
-                    stats = gnomad_response
-
-                # Prompt
-                prompt = f"""
-You are a clinical geneticist. Based on the following variant and annotation data, provide a professional clinical interpretation.
-
-🧬 Variant:
-- Chr: {row['CHROM']}, Pos: {row['POS']}, {row['REF']}→{row['ALT']}
-
-📑 ClinVar:
-- Gene: {row.get('GENE','N/A')}, Sig: {row.get('CLNSIG','N/A')}, Dis: {row.get('DISEASE','N/A')}
-
-🧪 ClinGen Validity: {row.get('ClinGen_Validity','N/A')}
-
-st.write(f"📚 PubMed: {', '.join(pmids) if pmids else 'None'}")
-
-📊 gnomAD:
-- Exome AC/AN: {stats.get('Exome_AC','N/A')}/{stats.get('Exome_AN','N/A')}
-- PopMax AF: {stats.get('PopMax_AF','N/A')} (Pop: {stats.get('PopMax_Pop','N/A')})
-
-🩺 Answer:
-1. Likely pathogenicity?
-2. Known disease?
-3. Clinical relevance?
-4. Plain-language summary (≤5 sents).
-"""
-                try:
-                    yorum = generate_with_gemini(prompt, api_key=api_key)
-                except Exception as e:
-                    yorum = f"❌ {e}"
-                pubmed_links = build_pubmed_links(pmids)  # URL'leri oluştur
-                results.append({
-                    **row.to_dict(),
-                    "PubMed_Links": ", ".join(pubmed_links),
-                    **stats,
-                    "Gemini_Yorum": yorum
-                })
-                time.sleep(0.3)
+            total = len(annotated)
+
+            cache_before = api_cache_counts()
+
+            # PubMed, gnomAD ve Gemini çağrıları servis başına eşzamanlı yürütülür;
+            # sonuçlar sütunlu tampona eklenir ve tablo belirli aralıklarla yenilenir
+            records = annotated.to_dict("records")
+            if records:
+                # Dış çağrılar satır başına değil, tekil ID/varyant başına yapılır
+                lookups = plan_annotations(records)["stats"]
+                st.caption(
+                    f"🧮 {lookups['rows']} satır → PubMed: {lookups['ids']} ID, "
+                    f"gnomAD: {lookups['keys']} varyant, Gemini: {lookups['units']} yorum"
+                )
+            buffer = ResultBuffer()
+            shown = set()
+            live_table = st.empty()
+            completed = 0
+            started = last_refresh = time.perf_counter()
+            checkpoint = RunCheckpoint.for_run(run_id)
+            try:
+                for pos, result, warnings in iter_checkpointed(
+                    records,
+                    checkpoint,
+                    iter_annotations,
+                    api_key=api_key,
+                    gemini_batch_size=int(gemini_batch_size),
+                ):
+                    # Aynı işe düşen satırlar aynı uyarıyı taşır; her uyarı bir kez gösterilir
+                    for w in warnings:
+                        if w not in shown:
+                            shown.add(w)
+                            st.warning(w)
+                    buffer.append(pos, result)
+                    completed += 1
+                    overall_pb.progress(completed / total)
+                    now = time.perf_counter()
+                    rate = completed / max(now - started, 1e-9)
+                    status.markdown(f"### 🔍 Processed variant {completed}/{total}:  "
+                        f"{result['CHROM']}:{result['POS']} {result['REF']}>{result['ALT']}  "
+                        f"({rate:.1f} varyant/sn)")
+                    if now - last_refresh >= TABLE_REFRESH_SECONDS:
+                        live_table.dataframe(results_preview(buffer.to_pandas()))
+                        last_refresh = now
+            finally:
+                checkpoint.close()
+            live_table.empty()
+            # Elenen satırlar dış anotasyon olmadan, eleme nedeniyle işaretlenmiş olarak eklenir
+            for i, row in enumerate(filter_report["filtered"].to_dict("records")):
+                buffer.append(len(records) + i, row)
+            st.session_state["results"] = {"run_id": run_id, "buffer": buffer}
 
         st.success("✅ Tamamlandı")
-        st.subheader("📊 Sonuçlar")
-        st.dataframe(pd.DataFrame(results))
+        with st.expander("🗄️ Önbellek istatistikleri"):
+            cache_rows = []
+            for name, (hits, misses) in api_cache_counts().items():
+                hits -= cache_before[name][0]
+                misses -= cache_before[name][1]
+                lookups = hits + misses
+                cache_rows.append({
+                    "Servis": name,
+                    "İsabet": hits,
+                    "Iska": misses,
+                    "İsabet oranı": f"{hits / lookups:.0%}" if lookups else "-",
+                })
+            st.dataframe(pd.DataFrame(cache_rows), hide_index=True)
+
+    # Sonuçlar oturumda saklanır; sayfa değiştirmek gibi etkileşimler tabloyu kaybettirmez
+    stored = st.session_state.get("results")
+    if stored and stored["run_id"] == run_id:
+        show_results(stored["buffer"], run_id)
+
+    show_metrics_panel()
@@ -0,0 +1,218 @@
+"""
+Streamlit dışında, bir dizindeki tüm VCF/VCF.gz/CSV dosyalarını toplu anotasyonlayan
+komut satırı aracı. Her örnek ayrı bir süreçte işlenir; referans veriler süreç
+başına bir kez yüklenir.
+
+Kullanım:
+    python batch_annotate.py vcfs/ --out results/ --format parquet --workers 8 --no-llm
+    GEMINI_API_KEY=... python batch_annotate.py vcfs/ --out results/
+    python batch_annotate.py vcfs/ --genes BRCA1,BRCA2,TP53 --no-llm
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from annotation_pipeline import iter_annotations
+from annotation_plan import plan_annotations, gene_summary
+from checkpoint import RunCheckpoint, make_run_id, iter_checkpointed
+from gemini_handler import GEMINI_MODEL
+from reference_data import (
+    CLINVAR_STORE_DIR, CLINVAR_SAMPLE_PATH, CLINGEN_PATH,
+    read_variants, match_variants,
+)
+from regions import resolve_panel
+from result_buffer import ResultBuffer
+from shared_resources import get_shared_resources
+from variant_filter import filter_variants
+
+logger = logging.getLogger(__name__)
+
+INPUT_SUFFIXES = (".vcf", ".vcf.gz", ".csv")
+OUTPUT_FORMATS = {"parquet": ".parquet", "tsv": ".tsv"}
+
+# İşçi süreç başına yüklenen referans veriler
+_reference = None
+
+
+def _init_worker(store_dir, sample_path, clingen_path):
+    global _reference
+    # İndeks bellek eşlemeli açılır; işçi süreçler aynı sayfaları paylaşır
+    _reference = get_shared_resources(store_dir, sample_path, clingen_path)
+
+
+def sample_name(path):
+    name = os.path.basename(path)
+    for suffix in sorted(INPUT_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def find_inputs(input_dir):
+    return sorted(
+        os.path.join(input_dir, f) for f in os.listdir(input_dir)
+        if f.endswith(INPUT_SUFFIXES) and os.path.isfile(os.path.join(input_dir, f))
+    )
+
+
+def find_index(path):
+    """VCF.gz'nin yanındaki .tbi/.csi indeksi (yoksa None)."""
+    for suffix in (".tbi", ".csi"):
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return None
+
+
+def write_results(df, path, fmt):
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, sep="\t", index=False)
+
+
+def annotate_file(path, out_dir, fmt="parquet", api_key=None, skip_llm=False, gemini_batch_size=1,
+                  filters=None, panel=None):
+    """
+    Tek bir örnek dosyasını okur, ClinVar/ClinGen ile eşleştirir, `filters`
+    (filter_variants argümanları) ile ön filtreden geçirir, PubMed/gnomAD
+    (ve istenirse Gemini) anotasyonlarını ekleyip sonucu `out_dir`'e yazar.
+    `panel` ({"genes", "bed"}) verilirse yalnızca bu bölgeler okunur; yanında
+    .tbi/.csi bulunan VCF.gz'lerde yalnızca ilgili bloklar açılır.
+    Dönüş: örnek özet sözlüğü.
+    """
+    start = time.perf_counter()
+    clinvar_df, clinvar_index, clingen_index = _reference.reference
+    panel = panel or {}
+    regions, missing = resolve_panel(clinvar_df, genes=panel.get("genes"), bed=panel.get("bed"),
+                                    spans=_reference.gene_spans)
+    if missing:
+        logger.warning(f"Genes not found in ClinVar: {', '.join(missing)}")
+    df = read_variants(path, regions=regions, index=find_index(path) if regions is not None else None)
+    _, matched = match_variants(df, clinvar_df, clinvar_index, clingen_index)
+    filters = filters or {}
+    annotated, filter_report = filter_variants(matched, use_llm=not skip_llm, **filters)
+
+    options = {"gemini_batch_size": gemini_batch_size}
+    if skip_llm:
+        options["interpret"] = None
+
+    # Örnek başına checkpoint: kesilen bir çalıştırma tamamlanan varyantları tekrar işlemez.
+    # Kimlik filtre sonrası satırlardan hesaplanır (AF filtresi önbelleğe bağlıdır)
+    run_id = make_run_id(annotated, llm=not skip_llm, model=GEMINI_MODEL, filters=filters)
+    checkpoint = RunCheckpoint.for_run(f"{sample_name(path)}-{run_id}", os.path.join(out_dir, "checkpoints"))
+    records = annotated.to_dict("records")
+    lookups = plan_annotations(records)["stats"] if records else {"units": 0}
+    buffer = ResultBuffer()
+    shown = set()
+    try:
+        for pos, result, warnings in iter_checkpointed(
+            records, checkpoint, iter_annotations, api_key=api_key, **options
+        ):
+            # Aynı işe düşen satırlar aynı uyarıyı taşır; her uyarı bir kez yazılır
+            for w in warnings:
+                if w not in shown:
+                    shown.add(w)
+                    logger.warning(w)
+            buffer.append(pos, result)
+    finally:
+        checkpoint.close()
+    # Elenen satırlar dış anotasyon olmadan, eleme nedeniyle işaretlenmiş olarak çıktıda kalır
+    for i, row in enumerate(filter_report["filtered"].to_dict("records")):
+        buffer.append(len(records) + i, row)
+
+    out_path = os.path.join(out_dir, sample_name(path) + OUTPUT_FORMATS[fmt])
+    out_df = buffer.to_pandas() if len(buffer) else matched
+    write_results(out_df, out_path, fmt)
+    gene_summary(out_df).to_csv(
+        os.path.join(out_dir, sample_name(path) + ".genes.tsv"), sep="\t", index=False
+    )
+    return {
+        "sample": sample_name(path),
+        "variants": len(df),
+        "matched": len(matched),
+        "annotated": len(annotated),
+        "filtered": filter_report["removed"],
+        "saved_calls": sum(filter_report["saved_calls"].values()),
+        "unique_lookups": lookups["units"],
+        "output": out_path,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def run_batch(input_dir, out_dir, fmt="parquet", workers=None, api_key=None, skip_llm=False,
+              gemini_batch_size=1, store_dir=CLINVAR_STORE_DIR, sample_path=CLINVAR_SAMPLE_PATH,
+              clingen_path=CLINGEN_PATH, filters=None, panel=None):
+    """Dizindeki tüm örnekleri süreç havuzunda işler; örnek özetlerinin listesini döndürür."""
+    if not skip_llm and not api_key:
+        raise ValueError("Gemini API anahtarı yok; --api-key verin ya da --no-llm kullanın.")
+    inputs = find_inputs(input_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    summaries = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(store_dir, sample_path, clingen_path),
+    ) as pool:
+        futures = {
+            pool.submit(annotate_file, path, out_dir, fmt, api_key, skip_llm, gemini_batch_size,
+                        filters, panel): path
+            for path in inputs
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                logger.error(f"Failed to annotate {path}: {e}")
+                summary = {"sample": sample_name(path), "error": str(e)}
+            else:
+                logger.info(f"{summary['sample']}: {summary['matched']}/{summary['variants']} "
+                            f"matched in {summary['seconds']}s")
+            summaries.append(summary)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VCF dizinini Streamlit olmadan toplu anotasyonlar.")
+    parser.add_argument("input_dir", help=".vcf/.vcf.gz/.csv dosyalarını içeren dizin")
+    parser.add_argument("--out", default="results", help="Çıktı dizini")
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default="parquet")
+    parser.add_argument("--workers", type=int, default=None, help="Süreç sayısı (varsayılan: çekirdek sayısı)")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"), help="Gemini API anahtarı")
+    parser.add_argument("--no-llm", action="store_true", help="Gemini yorumlama aşamasını atla")
+    parser.add_argument("--gemini-batch-size", type=int, default=1)
+    parser.add_argument("--keep-benign", action="store_true",
+                        help="Benign/Likely benign varyantları da anotasyonla (varsayılan: elenir)")
+    parser.add_argument("--min-stars", type=int, default=0, help="En az CLNREVSTAT yıldız seviyesi")
+    parser.add_argument("--clingen-class", action="append", dest="clingen_classes",
+                        help="Yalnızca bu ClinGen sınıfındaki genler (tekrarlanabilir)")
+    parser.add_argument("--max-af", type=float, default=None,
+                        help="Önbellekteki gnomAD PopMax AF bu değerden büyükse ele")
+    parser.add_argument("--genes", help="Gen paneli, virgülle ayrılmış (ör. BRCA1,BRCA2)")
+    parser.add_argument("--bed", help="Yalnızca bu BED bölgelerini analiz et")
+    parser.add_argument("--clinvar-store", default=CLINVAR_STORE_DIR)
+    parser.add_argument("--clinvar-sample", default=CLINVAR_SAMPLE_PATH)
+    parser.add_argument("--clingen", default=CLINGEN_PATH)
+    args = parser.parse_args()
+
+    filters = {"min_stars": args.min_stars, "clingen_classes": args.clingen_classes, "max_af": args.max_af}
+    if args.keep_benign:
+        filters["exclude_clnsig"] = None
+    summaries = run_batch(
+        args.input_dir, args.out, fmt=args.format, workers=args.workers, api_key=args.api_key,
+        skip_llm=args.no_llm, gemini_batch_size=args.gemini_batch_size,
+        store_dir=args.clinvar_store, sample_path=args.clinvar_sample, clingen_path=args.clingen,
+        filters=filters,
+        panel={"genes": args.genes.split(",") if args.genes else None, "bed": args.bed},
+    )
+    summary_path = os.path.join(args.out, "summary.tsv")
+    pd.DataFrame(summaries).to_csv(summary_path, sep="\t", index=False)
+    print(f"{len(summaries)} örnek işlendi; özet: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+add_gnomad_links: satır bazlı .apply yolu ile sütun işlemli üretimi karşılaştırır.
+
+Kullanım: python -m benchmarks.bench_gnomad_links --rows 1000000
+"""
+import argparse
+import time
+import urllib.parse
+
+from clinvar_parser import gnomad_links
+from benchmarks.synthetic import synthetic_clinvar
+
+
+def links_row_wise(df, genome_build="GRCh37"):
+    """Önceki uygulama: her satır için Python'da int/replace/strip/quote."""
+    def build_url(row):
+        chrom = str(row['CHROM']).replace("chr", "").strip()
+        pos = int(row['POS'])
+        ref = row['REF'].strip()
+        alt = row['ALT'].strip()
+        if not chrom or not ref or not alt:
+            return None
+        ds = "gnomad_r2_1" if genome_build == "GRCh37" else "gnomad_r4"
+        return f"https://gnomad.broadinstitute.org/variant/{chrom}-{pos}-{urllib.parse.quote(ref)}-{urllib.parse.quote(alt)}?dataset={ds}"
+
+    return df.apply(build_url, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = synthetic_clinvar(args.rows, seed=args.seed)
+    print(f"rows={args.rows}")
+    for build in ("GRCh37", "GRCh38"):
+        t0 = time.perf_counter()
+        old = links_row_wise(df, build)
+        t_old = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        new = gnomad_links(df, build)
+        t_new = time.perf_counter() - t0
+
+        same = old.where(old.notna(), None).tolist() == new.tolist()
+        print(f"{build} row-wise apply : {t_old:8.3f}s")
+        print(f"{build} vectorized     : {t_new:8.3f}s  (x{t_old / t_new:.1f})")
+        print(f"{build} identical output: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+enrich_clinvar_df: alan başına .apply yolu ile tek geçişli INFO ayrıştırmayı karşılaştırır.
+
+Kullanım: python -m benchmarks.bench_info_parsing --rows 200000
+"""
+import argparse
+import time
+
+from clinvar_parser import (
+    enrich_clinvar_df, extract_gene, extract_clnsig, extract_disease, extract_rs,
+    extract_clnvc, extract_clnhgvs, extract_clnrevstat,
+)
+from benchmarks.synthetic import synthetic_clinvar
+
+PER_FIELD = {
+    "GENE": extract_gene,
+    "CLNSIG": extract_clnsig,
+    "DISEASE": extract_disease,
+    "RS": extract_rs,
+    "CLNVC": extract_clnvc,
+    "CLNHGVS": extract_clnhgvs,
+    "CLNREVSTAT": extract_clnrevstat,
+}
+
+
+def enrich_per_field(df):
+    """Önceki uygulama: her alan için INFO üzerinde ayrı bir .apply geçişi."""
+    for col, fn in PER_FIELD.items():
+        df[col] = df["INFO"].apply(fn)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    base = synthetic_clinvar(args.rows, seed=args.seed)
+
+    t0 = time.perf_counter()
+    old = enrich_per_field(base.copy())
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = enrich_clinvar_df(base.copy())
+    t_new = time.perf_counter() - t0
+
+    cols = list(PER_FIELD)
+    same = all(
+        old[c].astype(object).where(old[c].notna(), None).tolist()
+        == new[c].astype(object).where(new[c].notna(), None).tolist()
+        for c in cols
+    )
+    print(f"rows={args.rows}")
+    print(f"per-field apply : {t_old:8.3f}s")
+    print(f"single pass     : {t_new:8.3f}s  (x{t_old / t_new:.1f})")
+    print(f"identical output: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Varyant başına sıralı döngü ile eşzamanlı anotasyon hattını yerel mock
+sunuculara karşı karşılaştırır.
+
+Kullanım: python -m benchmarks.bench_pipeline --variants 100 --latency 0.2
+"""
+import argparse
+import functools
+import time
+
+import requests
+
+import clinvar_parser
+import pubmed_handler
+from annotation_pipeline import build_prompt, iter_annotations
+from benchmarks.mock_servers import start_mock_server
+from benchmarks.synthetic import synthetic_clinvar
+from clinvar_parser import fetch_gnomad_simple, fetch_gnomad_batch
+from pubmed_handler import get_pubmed_ids_batch
+
+
+def make_interpret(base_url):
+    def interpret(prompt, api_key=None):
+        resp = requests.post(f"{base_url}/gemini", json={"prompt": prompt}, timeout=30)
+        resp.raise_for_status()
+        return resp.json()["text"]
+    return interpret
+
+
+def run_sequential(rows, interpret, sleep):
+    """Önceki app.py döngüsü: her varyant için sırayla PubMed, gnomAD, Gemini."""
+    results = []
+    for row in rows:
+        pmids = get_pubmed_ids_batch([str(int(row["ID"]))], cache=False, requests_per_second=1000)[0]
+        pmids = pmids if isinstance(pmids, list) else []
+        stats = fetch_gnomad_simple(row["CHROM"], row["POS"], row["REF"], row["ALT"], cache=False)
+        stats = stats if "error" not in stats else {}
+        results.append({**row, **stats, "Gemini_Yorum": interpret(build_prompt(row, pmids, stats))})
+        if sleep:
+            time.sleep(sleep)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--variants", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Her mock servis için gecikme (sn)")
+    parser.add_argument("--sleep", type=float, default=0.3, help="Sıralı döngüde varyant başına bekleme")
+    parser.add_argument("--respect-rate-limits", action="store_true",
+                        help="eutils için varsayılan istek hızı sınırını (3/sn) uygula")
+    args = parser.parse_args()
+
+    server, base = start_mock_server({"gnomad": args.latency, "eutils": args.latency, "gemini": args.latency})
+    clinvar_parser.GNOMAD_API_URL = f"{base}/gnomad/api"
+    pubmed_handler.ELINK_URL = f"{base}/eutils/elink.fcgi"
+    interpret = make_interpret(base)
+    rows = synthetic_clinvar(args.variants).drop(columns=["INFO"]).to_dict("records")
+
+    try:
+        t0 = time.perf_counter()
+        seq = run_sequential(rows, interpret, args.sleep)
+        t_seq = time.perf_counter() - t0
+        seq_counts = dict(server.counts)
+        server.counts.clear()
+
+        pubmed_rate = None if args.respect_rate_limits else 1000
+        t0 = time.perf_counter()
+        par = [None] * len(rows)
+        fetch_pubmed = functools.partial(get_pubmed_ids_batch, cache=False, requests_per_second=pubmed_rate)
+        fetch_gnomad = functools.partial(fetch_gnomad_batch, cache=False)
+        for pos, result, _ in iter_annotations(rows, interpret=interpret, fetch_pubmed=fetch_pubmed,
+                                               fetch_gnomad=fetch_gnomad):
+            par[pos] = result
+        t_par = time.perf_counter() - t0
+        par_counts = dict(server.counts)
+    finally:
+        server.shutdown()
+
+    in_order = all(a["ID"] == b["ID"] for a, b in zip(seq, par))
+    print(f"variants={args.variants} latency={args.latency}s")
+    print(f"sequential : {t_seq:8.2f}s  ({len(rows) / t_seq:6.1f} variants/s)")
+    print(f"pipeline   : {t_par:8.2f}s  ({len(rows) / t_par:6.1f} variants/s)  x{t_seq / t_par:.1f}")
+    print(f"requests   : sequential {seq_counts}, pipeline {par_counts}")
+    print(f"order kept : {in_order}")
+
+
+if __name__ == "__main__":
+    main()
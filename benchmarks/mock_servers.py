@@ -0,0 +1,110 @@
+"""
+gnomAD GraphQL, NCBI eutils elink ve Gemini uç noktalarını taklit eden,
+yapılandırılabilir gecikmeli yerel HTTP sunucusu.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_ALIAS_RE = re.compile(r'(\w+)\s*:\s*variant\s*\(\s*variantId\s*:\s*(?:"([^"]+)"|\$(\w+))')
+
+
+def _gnomad_stats(variant_id):
+    seed = sum(map(ord, variant_id))
+    if seed % 10 == 0:
+        return None  # gnomAD'da bulunmayan varyant
+    return {"exome": {"ac": seed % 97, "an": 250_000,
+                      "faf95": {"popmax": (seed % 97) / 250_000, "popmax_population": "nfe"}}}
+
+
+def _pmids(variation_id):
+    seed = int(variation_id) if str(variation_id).isdigit() else 0
+    return [str(30_000_000 + seed * 7 + k) for k in range(seed % 4)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self, service):
+        self.server.counts[service] = self.server.counts.get(service, 0) + 1
+        latency = self.server.latency.get(service, 0.0)
+        if latency:
+            time.sleep(latency)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith("elink.fcgi"):
+            self._delay("eutils")
+            self._reply(self._elink(parse_qs(url.query)))
+        else:
+            self._reply({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._body()
+        if url.path.startswith("/gnomad"):
+            self._delay("gnomad")
+            self._reply(self._gnomad(json.loads(body or b"{}")))
+        elif url.path.endswith("elink.fcgi"):
+            self._delay("eutils")
+            self._reply(self._elink(parse_qs(body.decode())))
+        elif url.path.startswith("/gemini"):
+            self._delay("gemini")
+            prompt = json.loads(body or b"{}").get("prompt", "")
+            self._reply({"text": f"Mock interpretation ({len(prompt)} chars)"})
+        else:
+            self._reply({"error": "not found"}, status=404)
+
+    def _gnomad(self, payload):
+        query = payload.get("query", "")
+        variables = payload.get("variables") or {}
+        aliases = _ALIAS_RE.findall(query)
+        if aliases:
+            return {"data": {alias: _gnomad_stats(vid or variables.get(var, ""))
+                             for alias, vid, var in aliases}}
+        vid = variables.get("variantId", "")
+        return {"data": {"variant": _gnomad_stats(vid)}}
+
+    def _elink(self, params):
+        linksets = []
+        for raw in params.get("id", []):
+            ids = raw.split(",")
+            links = [p for vid in ids for p in _pmids(vid)]
+            linkset = {"dbfrom": "clinvar", "ids": ids}
+            if links:
+                linkset["linksetdbs"] = [{"dbto": "pubmed", "linkname": "clinvar_pubmed", "links": links}]
+            linksets.append(linkset)
+        return {"header": {"type": "elink"}, "linksets": linksets}
+
+
+def start_mock_server(latency=None):
+    """
+    Arka planda mock sunucuyu başlatır.
+    `latency`: {"gnomad": sn, "eutils": sn, "gemini": sn}
+    Dönüş: (sunucu, taban_url); kapatmak için sunucu.shutdown()
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.latency = dict(latency or {})
+    server.counts = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
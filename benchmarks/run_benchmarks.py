@@ -0,0 +1,171 @@
+"""
+Sentetik girdiler ve mock servislerle aşama bazlı, tekrarlanabilir benchmark.
+
+Her boyut için .vcf/.vcf.gz/.csv girdileri üretilir; ayrıştırma, ClinVar INFO
+zenginleştirme, gnomAD bağlantı üretimi, indeks kurulumu, ClinVar birleştirme,
+ClinGen sorgusu ve PubMed/gnomAD/Gemini ağ dağıtımı ölçülür. Sonuçlar kayıtlı baseline ile
+karşılaştırılır (baseline'lar makineye özgüdür; aynı makinede güncelleyin).
+
+Kullanım:
+    python -m benchmarks.run_benchmarks --sizes 1000,100000
+    python -m benchmarks.run_benchmarks --sizes 1000,1000000,5000000 --clinvar-rows 1000000
+    python -m benchmarks.run_benchmarks --update-baseline
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import clinvar_parser
+import pubmed_handler
+from annotation_pipeline import iter_annotations
+from benchmarks.bench_pipeline import make_interpret
+from benchmarks.mock_servers import start_mock_server
+from benchmarks.synthetic import (
+    synthetic_clinvar, synthetic_variants, synthetic_clingen, write_vcf,
+)
+from clingen_handler import build_clingen_index, lookup_clingen, format_clingen_curations
+from clinvar_index import build_clinvar_index, join_clinvar
+from clinvar_parser import enrich_clinvar_df, fetch_gnomad_batch, gnomad_links
+from pubmed_handler import get_pubmed_ids_batch
+from reference_data import read_variants
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+
+def best_of(fn, repeat):
+    """`fn`'i `repeat` kez çalıştırır; en kısa süreyi ve son sonucu döndürür."""
+    best, result = float("inf"), None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def bench_reference(clinvar_rows, repeat, timings):
+    raw = synthetic_clinvar(clinvar_rows)
+    timings["enrich_clinvar_df"], clinvar = best_of(lambda: enrich_clinvar_df(raw.copy()), repeat)
+    timings["gnomad_links"], _ = best_of(lambda: gnomad_links(clinvar, "GRCh38"), repeat)
+    timings["build_clinvar_index"], index = best_of(lambda: build_clinvar_index(clinvar), repeat)
+    clingen_index = build_clingen_index(synthetic_clingen())
+    return clinvar, index, clingen_index
+
+
+def bench_inputs(size, clinvar, index, clingen_index, workdir, repeat, timings):
+    variants = synthetic_variants(size, clinvar)
+    paths = {
+        "vcf": write_vcf(variants, os.path.join(workdir, f"input-{size}.vcf")),
+        "vcf_gz": write_vcf(variants, os.path.join(workdir, f"input-{size}.vcf.gz")),
+        "csv": os.path.join(workdir, f"input-{size}.csv"),
+    }
+    variants.to_csv(paths["csv"], index=False)
+
+    df = None
+    for fmt, path in paths.items():
+        timings[f"parse_{fmt}[{size}]"], df = best_of(lambda p=path: read_variants(p), repeat)
+    timings[f"clinvar_merge[{size}]"], merged = best_of(lambda: join_clinvar(df, clinvar, index), repeat)
+    timings[f"clingen_lookup[{size}]"], _ = best_of(
+        lambda: (lookup_clingen(merged["GENE"], clingen_index, strongest=True),
+                 lookup_clingen(merged["GENE"], clingen_index).map(format_clingen_curations)),
+        repeat,
+    )
+    for path in paths.values():
+        os.remove(path)
+
+
+def bench_network(n_variants, latency, clinvar, timings):
+    server, base = start_mock_server({"gnomad": latency, "eutils": latency, "gemini": latency})
+    old_urls = clinvar_parser.GNOMAD_API_URL, pubmed_handler.ELINK_URL
+    clinvar_parser.GNOMAD_API_URL = f"{base}/gnomad/api"
+    pubmed_handler.ELINK_URL = f"{base}/eutils/elink.fcgi"
+    rows = clinvar.head(n_variants).to_dict("records")
+    try:
+        t0 = time.perf_counter()
+        for _ in iter_annotations(
+            rows,
+            interpret=make_interpret(base),
+            fetch_pubmed=functools.partial(get_pubmed_ids_batch, cache=False, requests_per_second=1000),
+            fetch_gnomad=functools.partial(fetch_gnomad_batch, cache=False),
+        ):
+            pass
+        timings[f"network_fanout[{len(rows)}]"] = time.perf_counter() - t0
+    finally:
+        clinvar_parser.GNOMAD_API_URL, pubmed_handler.ELINK_URL = old_urls
+        server.shutdown()
+
+
+def compare(timings, baseline, tolerance):
+    """Zamanlamaları baseline ile yazdırır; eşiği aşan aşamaların listesini döndürür."""
+    regressions = []
+    print(f"{'stage':32} {'seconds':>10} {'baseline':>10} {'ratio':>7}")
+    for name, seconds in timings.items():
+        base = baseline.get(name)
+        ratio = seconds / base if base else None
+        flag = ""
+        if ratio is not None and ratio > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:32} {seconds:10.4f} {base if base else float('nan'):10.4f} "
+              f"{ratio if ratio else float('nan'):7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000",
+                        help="Virgülle ayrılmış girdi boyutları (ör. 1000,1000000,5000000)")
+    parser.add_argument("--clinvar-rows", type=int, default=100_000)
+    parser.add_argument("--network-variants", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock servis gecikmesi (sn)")
+    parser.add_argument("--repeat", type=int, default=3, help="Aşama başına tekrar; en iyisi alınır")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="Baseline'a göre bu oranı aşan aşamalar gerileme sayılır")
+    parser.add_argument("--out", help="Sonuçları JSON olarak da yaz")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    timings = {}
+    clinvar, index, clingen_index = bench_reference(args.clinvar_rows, args.repeat, timings)
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            bench_inputs(size, clinvar, index, clingen_index, workdir, args.repeat, timings)
+    if args.network_variants:
+        bench_network(args.network_variants, args.latency, clinvar, timings)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("timings", {})
+    regressions = compare(timings, baseline, args.tolerance)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "clinvar_rows": args.clinvar_rows,
+        "latency": args.latency,
+        "timings": {k: round(v, 6) for k, v in timings.items()},
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        # Bu çalıştırmada ölçülmeyen aşamaların (ör. 5M girdi) baseline'ı korunur
+        stored = {"timings": baseline, **{k: v for k, v in report.items() if k != "timings"}}
+        stored["timings"].update(report["timings"])
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} stage(s) slower than baseline x{args.tolerance}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark'lar için sentetik ClinVar ve VCF verisi üreticileri."""
+import gzip
+
+import numpy as np
+import pandas as pd
+
+CHROMS = [str(i) for i in range(1, 23)] + ["X", "Y", "MT"]
+BASES = np.array(list("ACGT"))
+GENES = ["BRCA1", "BRCA2", "TP53", "CFTR", "MLH1", "MSH2", "APC", "LDLR", "MYH7", "SCN5A",
+         "KCNQ1", "RYR1", "FBN1", "PKD1", "ATM", "PALB2", "CHEK2", "GAA", "HEXA", "SMN1"]
+CLNSIGS = ["Pathogenic", "Likely_pathogenic", "Uncertain_significance", "Likely_benign",
+           "Benign", "Conflicting_classifications_of_pathogenicity", "Pathogenic/Likely_pathogenic"]
+REVSTATS = ["criteria_provided,_single_submitter", "criteria_provided,_multiple_submitters,_no_conflicts",
+            "reviewed_by_expert_panel", "no_assertion_criteria_provided", "practice_guideline"]
+DISEASES = ["Hereditary_breast_ovarian_cancer_syndrome", "not_provided", "Cystic_fibrosis",
+            "Lynch_syndrome", "Hypertrophic_cardiomyopathy", "not_specified|Inborn_genetic_diseases"]
+
+
+def synthetic_clinvar(n, seed=0):
+    """
+    ClinVar VCF'inin ilk 8 sütununa benzeyen `n` satırlık bir DataFrame üretir
+    (INFO alanı gerçek ClinVar sürümündeki anahtarları içerir).
+    """
+    rng = np.random.default_rng(seed)
+    chrom = rng.choice(CHROMS, n)
+    pos = rng.integers(10_000, 200_000_000, n)
+    ref = BASES[rng.integers(0, 4, n)]
+    alt = BASES[(rng.integers(1, 4, n) + np.searchsorted(BASES, ref)) % 4]
+    ids = np.arange(1, n + 1)
+    gene_idx = rng.integers(0, len(GENES), n)
+    genes = np.array(GENES)[gene_idx]
+    info = [
+        f"ALLELEID={i + 100000};CLNDISDB=MedGen:C{i % 9999:07d};"
+        f"CLNDN={DISEASES[i % len(DISEASES)]};"
+        f"CLNHGVS=NC_0000{c}.11:g.{p}{r}>{a};"
+        f"CLNREVSTAT={REVSTATS[i % len(REVSTATS)]};"
+        f"CLNSIG={CLNSIGS[i % len(CLNSIGS)]};CLNVC=single_nucleotide_variant;"
+        f"CLNVCSO=SO:0001483;GENEINFO={g}:{672 + gi};"
+        f"MC=SO:0001583|missense_variant;ORIGIN=1;RS={800000 + i}"
+        for i, c, p, r, a, g, gi in zip(ids, chrom, pos, ref, alt, genes, gene_idx)
+    ]
+    return pd.DataFrame({
+        "CHROM": chrom, "POS": pos, "ID": ids, "REF": ref, "ALT": alt,
+        "QUAL": ".", "FILTER": ".", "INFO": info,
+    })
+
+
+def synthetic_variants(n, clinvar=None, match_fraction=0.5, seed=1):
+    """
+    `n` satırlık CHROM/POS/REF/ALT girdi tablosu üretir; `clinvar` verilirse
+    satırların yaklaşık `match_fraction` kadarı ClinVar'daki varyantlardan seçilir.
+    """
+    rng = np.random.default_rng(seed)
+    chrom = rng.choice(CHROMS, n).astype(object)
+    pos = rng.integers(10_000, 200_000_000, n)
+    ref = BASES[rng.integers(0, 4, n)].astype(object)
+    alt = BASES[(rng.integers(1, 4, n) + np.searchsorted(BASES, ref.astype(str))) % 4].astype(object)
+    if clinvar is not None and len(clinvar) and match_fraction > 0:
+        hit = rng.random(n) < match_fraction
+        src = clinvar.iloc[rng.integers(0, len(clinvar), int(hit.sum()))]
+        chrom[hit] = src["CHROM"].to_numpy(dtype=object)
+        pos[hit] = src["POS"].to_numpy()
+        ref[hit] = src["REF"].to_numpy(dtype=object)
+        alt[hit] = src["ALT"].to_numpy(dtype=object)
+    return pd.DataFrame({"CHROM": chrom, "POS": pos, "REF": ref, "ALT": alt})
+
+
+def synthetic_clingen():
+    """GENES listesindeki her gen için bir ya da iki ClinGen küratörlüğü."""
+    classes = ["Definitive", "Strong", "Moderate", "Limited", "Disputed"]
+    rows = []
+    for i, gene in enumerate(GENES):
+        for k in range(1 + i % 2):
+            rows.append({"GENE SYMBOL": gene, "DISEASE LABEL": f"{gene} related disorder {k}",
+                         "MOI": "AD" if i % 3 else "AR", "CLASSIFICATION": classes[(i + k) % len(classes)]})
+    return pd.DataFrame(rows)
+
+
+def write_vcf(df, path, chunksize=500_000):
+    """
+    CHROM/POS/REF/ALT tablosunu minimal bir VCF olarak yazar (ID yoksa ".");
+    yol ".gz" ile bitiyorsa gzip ile sıkıştırılır.
+    """
+    opener = (lambda p: gzip.open(p, "wt", compresslevel=1)) if str(path).endswith(".gz") else \
+        (lambda p: open(p, "w"))
+    with opener(path) as f:
+        f.write("##fileformat=VCFv4.2\n")
+        f.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n")
+        for start in range(0, len(df), chunksize):
+            part = df.iloc[start:start + chunksize]
+            part = pd.DataFrame({
+                "CHROM": part["CHROM"], "POS": part["POS"],
+                "ID": part["ID"] if "ID" in part else ".",
+                "REF": part["REF"], "ALT": part["ALT"], "QUAL": ".", "FILTER": ".", "INFO": ".",
+            })
+            part.to_csv(f, sep="\t", header=False, index=False)
+    return path
@@ -0,0 +1,382 @@
+"""
+BGZF (bgzip) blok sıkıştırması ile tabix (.tbi) ve CSI (.csi) indekslerinin
+saf Python okuyucu/yazıcısı. İndeksli bir VCF.gz'de yalnızca istenen
+bölgelere denk gelen bloklar açılır.
+
+Kullanım (indeks oluşturma):
+    python bgzf_index.py sample.vcf.gz   # sample.vcf.gz.tbi yazar (gerekirse önce bgzip'ler)
+"""
+import argparse
+import gzip
+import io
+import logging
+import os
+import struct
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+BGZF_BLOCK_SIZE = 0xFF00  # blok başına en fazla sıkıştırılmamış bayt (bgzip ile aynı)
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+# tabix varsayılanları: 16 kb pencere, 6 seviyeli ikili (binning) şema
+TBI_MIN_SHIFT = 14
+TBI_DEPTH = 5
+TBI_FORMAT_VCF = 2
+
+_BGZF_HEADER = struct.Struct("<4sIBBHHHH")
+
+# Bozuk/kesik indeks ya da BGZF verisi okunurken fırlayabilen hatalar
+CORRUPT_INPUT_ERRORS = (OSError, EOFError, zlib.error, struct.error)
+
+
+# --- Bin hesapları (htslib hts_reg2bin / hts_reg2bins) ---
+def reg2bin(beg, end, min_shift=TBI_MIN_SHIFT, depth=TBI_DEPTH):
+    """0 tabanlı yarı açık [beg, end) aralığını içeren en küçük bin."""
+    end -= 1
+    s, t = min_shift, ((1 << (depth * 3)) - 1) // 7
+    for level in range(depth, 0, -1):
+        if beg >> s == end >> s:
+            return t + (beg >> s)
+        s += 3
+        t -= 1 << ((level - 1) * 3)
+    return 0
+
+
+def reg2bins(beg, end, min_shift=TBI_MIN_SHIFT, depth=TBI_DEPTH):
+    """[beg, end) aralığıyla çakışabilecek tüm binler."""
+    end -= 1
+    bins = []
+    s, t = min_shift + depth * 3, 0
+    for level in range(depth + 1):
+        bins.extend(range(t + (beg >> s), t + (end >> s) + 1))
+        s -= 3
+        t += 1 << (level * 3)
+    return bins
+
+
+def _pseudo_bin(depth):
+    # htslib'in meta veri için kullandığı sahte bin numarası
+    return ((1 << ((depth + 1) * 3)) - 1) // 7 + 1
+
+
+# --- BGZF okuma / yazma ---
+def _compress_block(data):
+    deflate = zlib.compressobj(6, zlib.DEFLATED, -15)
+    cdata = deflate.compress(data) + deflate.flush()
+    bsize = _BGZF_HEADER.size + len(cdata) + 8 - 1
+    header = _BGZF_HEADER.pack(b"\x1f\x8b\x08\x04", 0, 0, 0xFF, 6, 0x4342, 2, bsize)
+    return header + cdata + struct.pack("<II", zlib.crc32(data) & 0xFFFFFFFF, len(data))
+
+
+class BgzfWriter:
+    """Satır satır BGZF yazar; her satırın sanal dosya konumunu (virtual offset) bildirir."""
+
+    def __init__(self, fileobj):
+        self._out = fileobj
+        self._coffset = 0
+        self._buffer = bytearray()
+
+    def tell(self):
+        """Sıradaki baytın sanal konumu: (sıkıştırılmış blok konumu << 16) | blok içi konum."""
+        return (self._coffset << 16) | len(self._buffer)
+
+    def _flush_block(self):
+        block = _compress_block(bytes(self._buffer))
+        self._out.write(block)
+        self._coffset += len(block)
+        self._buffer.clear()
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            room = BGZF_BLOCK_SIZE - len(self._buffer)
+            self._buffer += view[:room]
+            view = view[room:]
+            if len(self._buffer) >= BGZF_BLOCK_SIZE:
+                self._flush_block()
+
+    def close(self):
+        if self._buffer:
+            self._flush_block()
+        self._out.write(BGZF_EOF)
+
+
+class BgzfReader:
+    """Sanal konum aralıklarını okur; son açılan bloklar bellekte tutulur."""
+
+    def __init__(self, fileobj, cache_blocks=64):
+        self._raw = fileobj
+        self._blocks = OrderedDict()
+        self._cache_blocks = cache_blocks
+        self.blocks_read = 0
+
+    def _block(self, coffset):
+        """(sıkıştırılmamış veri, sonraki bloğun konumu)"""
+        cached = self._blocks.get(coffset)
+        if cached is not None:
+            self._blocks.move_to_end(coffset)
+            return cached
+        self._raw.seek(coffset)
+        head = self._raw.read(12)
+        if len(head) < 12:
+            return b"", coffset
+        if head[:4] != b"\x1f\x8b\x08\x04":
+            raise ValueError("BGZF olmayan gzip bloğu (dosya bgzip ile sıkıştırılmamış)")
+        xlen = struct.unpack("<H", head[10:12])[0]
+        extra = self._raw.read(xlen)
+        bsize = None
+        i = 0
+        while i + 4 <= len(extra):
+            si1, si2, slen = extra[i], extra[i + 1], struct.unpack("<H", extra[i + 2:i + 4])[0]
+            if si1 == 66 and si2 == 67:
+                bsize = struct.unpack("<H", extra[i + 4:i + 6])[0]
+            i += 4 + slen
+        if bsize is None:
+            raise ValueError("BGZF bloğunda BC alanı yok")
+        cdata = self._raw.read(bsize + 1 - 12 - xlen - 8)
+        self._raw.read(8)
+        data = zlib.decompress(cdata, -15)
+        self.blocks_read += 1
+        result = (data, coffset + bsize + 1)
+        self._blocks[coffset] = result
+        if len(self._blocks) > self._cache_blocks:
+            self._blocks.popitem(last=False)
+        return result
+
+    def read_range(self, voff_beg, voff_end):
+        """[voff_beg, voff_end) sanal aralığındaki sıkıştırılmamış baytlar."""
+        coffset, uoffset = voff_beg >> 16, voff_beg & 0xFFFF
+        end_coffset, end_uoffset = voff_end >> 16, voff_end & 0xFFFF
+        parts = []
+        while coffset < end_coffset or (coffset == end_coffset and end_uoffset):
+            data, next_coffset = self._block(coffset)
+            if not data and next_coffset == coffset:
+                break
+            stop = end_uoffset if coffset == end_coffset else len(data)
+            parts.append(data[uoffset:stop])
+            coffset, uoffset = next_coffset, 0
+        return b"".join(parts)
+
+
+def is_bgzf(fileobj):
+    pos = fileobj.tell()
+    head = fileobj.read(16)
+    fileobj.seek(pos)
+    return len(head) >= 16 and head[:4] == b"\x1f\x8b\x08\x04" and head[12:14] == b"BC"
+
+
+# --- İndeks okuma ---
+def _read_names(buf):
+    return [n.decode() for n in buf.split(b"\x00") if n]
+
+
+def _parse_tbi(data):
+    n_ref, fmt, col_seq, col_beg, col_end, meta, skip, l_nm = struct.unpack_from("<8i", data, 4)
+    off = 36
+    names = _read_names(data[off:off + l_nm])
+    off += l_nm
+    refs = []
+    for _ in range(n_ref):
+        (n_bin,) = struct.unpack_from("<i", data, off)
+        off += 4
+        bins = {}
+        for _ in range(n_bin):
+            bin_, n_chunk = struct.unpack_from("<Ii", data, off)
+            bins[bin_] = (off + 8, n_chunk)
+            off += 8 + 16 * n_chunk
+        (n_intv,) = struct.unpack_from("<i", data, off)
+        off += 4
+        ioff = list(struct.unpack_from(f"<{n_intv}Q", data, off))
+        off += 8 * n_intv
+        refs.append({"bins": bins, "loffset": {}, "ioff": ioff, "data": data})
+    return {"names": names, "min_shift": TBI_MIN_SHIFT, "depth": TBI_DEPTH, "refs": refs,
+            "format": fmt, "meta": chr(meta)}
+
+
+def _parse_csi(data):
+    min_shift, depth, l_aux = struct.unpack_from("<3i", data, 4)
+    off = 16
+    aux = data[off:off + l_aux]
+    off += l_aux
+    names, fmt, meta = [], None, "#"
+    if l_aux >= 28:
+        fmt, _, _, _, meta_ord, _, l_nm = struct.unpack_from("<7i", aux, 0)
+        names = _read_names(aux[28:28 + l_nm])
+        meta = chr(meta_ord)
+    (n_ref,) = struct.unpack_from("<i", data, off)
+    off += 4
+    refs = []
+    for _ in range(n_ref):
+        (n_bin,) = struct.unpack_from("<i", data, off)
+        off += 4
+        bins, loffset = {}, {}
+        for _ in range(n_bin):
+            bin_, loff, n_chunk = struct.unpack_from("<IQi", data, off)
+            bins[bin_] = (off + 16, n_chunk)
+            loffset[bin_] = loff
+            off += 16 + 16 * n_chunk
+        refs.append({"bins": bins, "loffset": loffset, "ioff": [], "data": data})
+    return {"names": names, "min_shift": min_shift, "depth": depth, "refs": refs,
+            "format": fmt, "meta": meta}
+
+
+def load_index(source):
+    """
+    .tbi ya da .csi indeksini (yol veya dosya benzeri nesne) okur.
+    Dönüş: {"names", "min_shift", "depth", "refs": [{"bins", "loffset", "ioff"}], ...}
+    Bin parçaları (chunk) ayrıştırılmaz; sorgu sırasında yalnızca gereken binler okunur.
+    Bozuk, gzip olmayan ya da kesik indeksler için ValueError fırlatır.
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        with open(source, "rb") as f:
+            raw = f.read()
+    else:
+        source.seek(0)
+        raw = source.read()
+    try:
+        data = gzip.decompress(raw)
+        if data[:4] == b"TBI\x01":
+            return _parse_tbi(data)
+        if data[:4] == b"CSI\x01":
+            return _parse_csi(data)
+    except CORRUPT_INPUT_ERRORS as e:
+        raise ValueError(f"İndeks okunamadı: {e}") from e
+    raise ValueError("Tanınmayan indeks biçimi (.tbi veya .csi bekleniyor)")
+
+
+def _bin_chunks(ref, bin_):
+    entry = ref["bins"].get(bin_)
+    if entry is None:
+        return []
+    off, n_chunk = entry
+    flat = struct.unpack_from(f"<{2 * n_chunk}Q", ref["data"], off)
+    return zip(flat[::2], flat[1::2])
+
+
+def query_chunks(index, tid, beg, end):
+    """
+    Referans `tid` üzerindeki 0 tabanlı [beg, end) bölgesi için okunması
+    gereken sanal konum aralıkları (sıralı ve birleştirilmiş).
+    """
+    ref = index["refs"][tid]
+    min_shift, depth = index["min_shift"], index["depth"]
+    pseudo = _pseudo_bin(depth)
+
+    min_off = 0
+    if ref["ioff"]:
+        ioff = ref["ioff"]
+        min_off = ioff[min(beg >> min_shift, len(ioff) - 1)]
+    elif ref["loffset"]:
+        leaf = ((1 << (depth * 3)) - 1) // 7 + (beg >> min_shift)
+        min_off = ref["loffset"].get(leaf, 0)
+
+    chunks = sorted(
+        (b, e)
+        for bin_ in reg2bins(beg, end, min_shift, depth) if bin_ != pseudo
+        for b, e in _bin_chunks(ref, bin_)
+        if e > min_off
+    )
+    merged = []
+    for b, e in chunks:
+        b = max(b, min_off)
+        if merged and b <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([b, e])
+    return [tuple(c) for c in merged]
+
+
+# --- İndeks oluşturma ---
+def _write_tbi(names, refs):
+    out = io.BytesIO()
+    l_nm = sum(len(n) + 1 for n in names)
+    out.write(b"TBI\x01")
+    out.write(struct.pack("<8i", len(names), TBI_FORMAT_VCF, 1, 2, 0, ord("#"), 0, l_nm))
+    out.write(b"".join(n.encode() + b"\x00" for n in names))
+    for ref in refs:
+        out.write(struct.pack("<i", len(ref["bins"])))
+        for bin_, chunks in sorted(ref["bins"].items()):
+            out.write(struct.pack("<Ii", bin_, len(chunks)))
+            for b, e in chunks:
+                out.write(struct.pack("<QQ", b, e))
+        ioff = ref["ioff"]
+        for i in range(1, len(ioff)):
+            # Boş pencereler bir önceki pencerenin konumunu alır (htslib ile aynı)
+            if ioff[i] == 0:
+                ioff[i] = ioff[i - 1]
+        out.write(struct.pack("<i", len(ioff)))
+        out.write(struct.pack(f"<{len(ioff)}Q", *ioff))
+    return out.getvalue()
+
+
+def bgzip_and_index(lines, out_path):
+    """
+    Sıralı VCF satırlarını (bayt dizileri, satır sonlarıyla) BGZF olarak
+    `out_path`'e yazar ve yanına tabix indeksi (`out_path`.tbi) oluşturur.
+    """
+    names, refs = [], []
+    tid_of = {}
+    with open(out_path, "wb") as f:
+        writer = BgzfWriter(f)
+        for line in lines:
+            if line.startswith(b"#"):
+                writer.write(line)
+                continue
+            fields = line.split(b"\t", 4)
+            chrom = fields[0].decode()
+            tid = tid_of.get(chrom)
+            if tid is None:
+                tid = tid_of[chrom] = len(names)
+                names.append(chrom)
+                refs.append({"bins": {}, "ioff": []})
+            beg = int(fields[1]) - 1
+            end = beg + max(1, len(fields[3]))
+
+            voff_beg = writer.tell()
+            writer.write(line)
+            voff_end = writer.tell()
+
+            ref = refs[tid]
+            chunks = ref["bins"].setdefault(reg2bin(beg, end), [])
+            if chunks and chunks[-1][1] == voff_beg:
+                chunks[-1][1] = voff_end
+            else:
+                chunks.append([voff_beg, voff_end])
+            ioff = ref["ioff"]
+            for window in range(beg >> TBI_MIN_SHIFT, ((end - 1) >> TBI_MIN_SHIFT) + 1):
+                if window >= len(ioff):
+                    ioff.extend([0] * (window + 1 - len(ioff)))
+                if ioff[window] == 0:
+                    ioff[window] = voff_beg
+        writer.close()
+
+    index_path = out_path + ".tbi"
+    with open(index_path, "wb") as f:
+        writer = BgzfWriter(f)
+        writer.write(_write_tbi(names, refs))
+        writer.close()
+    logger.info(f"Wrote {out_path} and tabix index for {len(names)} contigs")
+    return index_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VCF'i bgzip'ler ve tabix (.tbi) indeksi oluşturur.")
+    parser.add_argument("vcf", help="Koordinata göre sıralı .vcf veya .vcf.gz")
+    parser.add_argument("--out", help="Çıktı .vcf.gz (varsayılan: girişin yanına)")
+    args = parser.parse_args()
+
+    out = args.out or (args.vcf if args.vcf.endswith(".gz") else args.vcf + ".gz")
+    target = out + ".tmp" if os.path.abspath(out) == os.path.abspath(args.vcf) else out
+    opener = gzip.open if args.vcf.endswith(".gz") else open
+    with opener(args.vcf, "rb") as f:
+        bgzip_and_index(f, target)
+    if target != out:
+        os.replace(target, out)
+        os.replace(target + ".tbi", out + ".tbi")
+    print(f"{out}.tbi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from clinvar_parser import GNOMAD_NO_DATA
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.environ.get("GENETIK_CHECKPOINT_DIR", "checkpoints")
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value)
+
+
+def _clean(result):
+    # NaN değerleri JSON'da null olarak saklanır
+    return {
+        k: (None if isinstance(v, float) and math.isnan(v) else v)
+        for k, v in result.items()
+    }
+
+
+# Checkpoint satırını varyanta bağlayan sütunlar: konum tek başına yeterli değildir;
+# referans veri ya da filtre değişirse aynı konumda başka bir varyant olabilir
+ROW_KEY_COLUMNS = ["CHROM", "POS", "REF", "ALT", "ID"]
+
+
+def row_key(row):
+    """Sonucun ait olduğu satırın anahtarı: CHROM:POS:REF:ALT:Variation ID."""
+    return ":".join(str(row.get(c)) for c in ROW_KEY_COLUMNS)
+
+
+def make_run_id(variants_df, **options):
+    """
+    Anotasyonlanacak satırlar (CHROM/POS/REF/ALT ve varsa Variation ID) ve
+    sonucu etkileyen seçeneklerden (ör. LLM açık/kapalı, model) kararlı bir
+    çalıştırma kimliği üretir. Filtreler önbelleğe bağlı olabildiğinden
+    kimlik, yüklenen dosyadan değil filtre sonrası satırlardan hesaplanmalıdır.
+    """
+    h = hashlib.sha256()
+    keys = variants_df[[c for c in ROW_KEY_COLUMNS if c in variants_df.columns]].astype(str)
+    h.update(pd.util.hash_pandas_object(keys, index=False).to_numpy().tobytes())
+    h.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+class RunCheckpoint:
+    """
+    Bir anotasyon çalıştırmasının tamamlanan varyant sonuçlarını, varyant
+    konumu ve satır anahtarıyla birlikte SQLite dosyasına ekleyerek saklar.
+    Oturum düşse de tamamlanan sonuçlar kaybolmaz; yeniden başlatınca
+    yalnızca eksik konumlar işlenir.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (pos INTEGER PRIMARY KEY, key TEXT, result TEXT NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "key" not in columns:
+            # Eski checkpoint'ler: anahtarsız satırlar hiçbir zaman yeniden kullanılmaz
+            self._conn.execute("ALTER TABLE results ADD COLUMN key TEXT")
+        self._conn.commit()
+
+    @staticmethod
+    def run_path(run_id, directory=CHECKPOINT_DIR):
+        return os.path.join(directory, f"run-{run_id}.sqlite")
+
+    @classmethod
+    def for_run(cls, run_id, directory=CHECKPOINT_DIR):
+        return cls(cls.run_path(run_id, directory))
+
+    @classmethod
+    def existing(cls, run_id, directory=CHECKPOINT_DIR):
+        """Çalıştırmanın checkpoint dosyası varsa onu açar; yoksa dosya oluşturmadan None döndürür."""
+        path = cls.run_path(run_id, directory)
+        return cls(path) if os.path.exists(path) else None
+
+    def record(self, pos, result, key=None):
+        payload = json.dumps(_clean(result), default=_jsonable)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (pos, key, result) VALUES (?, ?, ?)",
+                (int(pos), key, payload),
+            )
+            self._conn.commit()
+
+    def entries(self):
+        """Tamamlanmış sonuçlar satır anahtarlarıyla: {konum: (anahtar, sonuç)}."""
+        with self._lock:
+            rows = self._conn.execute("SELECT pos, key, result FROM results ORDER BY pos").fetchall()
+        return {pos: (key, json.loads(result)) for pos, key, result in rows}
+
+    def completed(self):
+        """Tamamlanmış sonuçlar: {konum: sonuç}."""
+        return {pos: result for pos, (_, result) in self.entries().items()}
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def to_frame(self):
+        """Şu ana kadar tamamlanan sonuçları konum sırasıyla DataFrame olarak döndürür."""
+        done = self.completed()
+        return pd.DataFrame([done[pos] for pos in sorted(done)])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def is_complete(result, warnings):
+    """
+    Geçici hata içermeyen sonuçlar checkpoint'e yazılır; hatalılar yeniden denenir.
+    gnomAD'da kaydı olmayan varyant bir hata değil, kalıcı bir sonuçtur.
+    """
+    if any(GNOMAD_NO_DATA not in w for w in warnings):
+        return False
+    answer = str(result.get("Gemini_Yorum", ""))
+    return not answer.startswith(("❌", "🛑"))
+
+
+def iter_checkpointed(rows, checkpoint, annotate, **kwargs):
+    """
+    `annotate` (ör. iter_annotations) çıktısını checkpoint'e yazarak aktarır.
+    Daha önce tamamlanmış konumlar yeniden çalıştırılmaz, önce onlar üretilir;
+    hata içeren sonuçlar yazılmadığından sonraki çalıştırmada tekrar denenir.
+    Kayıtlı anahtarı `rows` içindeki satırla (row_key) uyuşmayan sonuçlar
+    kullanılmaz, o konum yeniden anotasyonlanır.
+    Dönüş biçimi `annotate` ile aynıdır: (konum, sonuç, uyarılar).
+    """
+    rows = list(rows)
+    keys = [row_key(row) for row in rows]
+    entries = checkpoint.entries()
+    done = {pos: result for pos, (key, result) in entries.items() if pos < len(rows) and key == keys[pos]}
+    if entries:
+        logger.info(f"Resuming run from {checkpoint.path}: {len(done)}/{len(rows)} already completed")
+    if len(done) < len(entries):
+        logger.warning(f"Ignoring {len(entries) - len(done)} checkpointed results that no longer match their rows")
+    for pos in sorted(done):
+        yield pos, done[pos], []
+
+    todo = [pos for pos in range(len(rows)) if pos not in done]
+    if not todo:
+        return
+    for sub_pos, result, warnings in annotate([rows[p] for p in todo], **kwargs):
+        pos = todo[sub_pos]
+        if is_complete(result, warnings):
+            checkpoint.record(pos, result, keys[pos])
+        yield pos, result, warnings
@@ -1,19 +1,84 @@
 import pandas as pd
 
+# Güçlüden zayıfa ClinGen gen-hastalık geçerlilik sınıfları
+CLASSIFICATION_ORDER = [
+    "Definitive",
+    "Strong",
+    "Moderate",
+    "Limited",
+    "Disputed",
+    "Refuted",
+    "No Known Disease Relationship",
+]
+NO_CLASSIFICATION = "Yok"
+
+
 def load_clingen_validity(path="Clingen-Gene-Disease-Summary-2025-07-01.csv"):
     try:
-        df_raw = pd.read_csv(path, header=None)
-        df = df_raw.iloc[5:]  # 6. satırdan itibaren veri
-        df.columns = df_raw.iloc[4]  # Gerçek başlıkları 5. satırdan al
-        df = df[["GENE SYMBOL", "DISEASE LABEL", "CLASSIFICATION"]].dropna()
-        return df
+        # İlk 4 satır dosya bilgisi, 5. satır başlık, 6. satır "+++" ayracı
+        df = pd.read_csv(path, skiprows=[0, 1, 2, 3, 5], dtype=str)
+        df = df[["GENE SYMBOL", "DISEASE LABEL", "MOI", "CLASSIFICATION"]]
+        return df.dropna(subset=["GENE SYMBOL", "DISEASE LABEL", "CLASSIFICATION"])
     except Exception as e:
         print("ClinGen dosyası okunamadı:", e)
         return pd.DataFrame()
 
+
+def _strength(classification):
+    try:
+        return CLASSIFICATION_ORDER.index(classification)
+    except ValueError:
+        return len(CLASSIFICATION_ORDER)
+
+
+def build_clingen_index(df_clingen):
+    """
+    Gen sembolü -> küratörlükler sözlüğünü bir kez oluşturur.
+    Dönüş: {"curations": {gen: [{"disease", "moi", "classification"}, ...]},
+            "strongest": {gen: en güçlü sınıflandırma}}
+    Her genin küratörlükleri güçlüden zayıfa sıralıdır.
+    """
+    curations = {}
+    if not df_clingen.empty:
+        for gene, disease, moi, cls in df_clingen[
+            ["GENE SYMBOL", "DISEASE LABEL", "MOI", "CLASSIFICATION"]
+        ].itertuples(index=False):
+            curations.setdefault(gene, []).append(
+                {"disease": disease, "moi": moi, "classification": cls}
+            )
+    for items in curations.values():
+        items.sort(key=lambda c: _strength(c["classification"]))
+    strongest = {gene: items[0]["classification"] for gene, items in curations.items()}
+    return {"curations": curations, "strongest": strongest}
+
+
+def lookup_clingen(genes, clingen_index, strongest=False):
+    """
+    Bir gen sütunu için toplu ClinGen sorgusu.
+    strongest=False: her satır için tüm küratörlüklerin listesi (yoksa boş liste).
+    strongest=True: her satır için en güçlü sınıflandırma (yoksa "Yok").
+    """
+    genes = pd.Series(genes).astype(object)
+    if strongest:
+        return genes.map(clingen_index["strongest"]).fillna(NO_CLASSIFICATION).astype(object)
+    found = genes.map(clingen_index["curations"])
+    return found.map(lambda c: c if isinstance(c, list) else [])
+
+
+def format_clingen_curations(curations):
+    """Küratörlük listesini 'Sınıf: hastalık (MOI)' biçiminde tek satıra çevirir."""
+    if not curations:
+        return NO_CLASSIFICATION
+    return "; ".join(
+        f"{c['classification']}: {c['disease']} ({c['moi']})" for c in curations
+    )
+
+
 def get_clingen_classification(gene_symbol, df_clingen):
+    """Tek gen için en güçlü sınıflandırma; indeks ya da ClinGen DataFrame'i kabul eder."""
+    if isinstance(df_clingen, dict):
+        return df_clingen["strongest"].get(gene_symbol, NO_CLASSIFICATION)
     gene_row = df_clingen[df_clingen["GENE SYMBOL"] == gene_symbol]
     if not gene_row.empty:
-        return gene_row.iloc[0]["CLASSIFICATION"]
-    return "Yok"
-
+        return min(gene_row["CLASSIFICATION"], key=_strength)
+    return NO_CLASSIFICATION
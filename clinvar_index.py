@@ -0,0 +1,223 @@
+import hashlib
+import logging
+import os
+import struct
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from variant_normalizer import normalize_key_columns
+from variant_table import variant_keys as _variant_keys, is_packed
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ["CHROM", "POS", "REF", "ALT"]
+
+# Anahtar normalizasyonu değiştiğinde artırılır; eski sürümle kaydedilmiş indeksler yeniden kurulur
+INDEX_VERSION = 3
+# Tablo parmak izi için örneklenen en fazla satır sayısı
+FINGERPRINT_ROWS = 4096
+
+
+# --- Anahtar üretimi ---
+def variant_keys(df, normalized=False):
+    """
+    Her satır için (CHROM, POS, REF, ALT) üzerinden 64-bit anahtar üretir
+    (SNV'ler için paketlenmiş kesin anahtar, diğerleri için hash; bkz. variant_table).
+    """
+    keys_df = df[KEY_COLUMNS] if normalized else normalize_key_columns(df)
+    return _variant_keys(keys_df)
+
+
+# --- İndeks oluşturma / saklama ---
+def table_fingerprint(clinvar_df):
+    """
+    Tablonun ucuz parmak izi: eşit aralıklı en fazla FINGERPRINT_ROWS satırın
+    CHROM/POS/REF/ALT değerleri, konumlarıyla birlikte özetlenir. Aynı boyutta
+    ama farklı içerikli ya da farklı sıralı bir tablo farklı iz verir.
+    """
+    step = max(1, len(clinvar_df) // FINGERPRINT_ROWS)
+    sample = clinvar_df[KEY_COLUMNS].iloc[::step].astype(str)
+    hashed = pd.util.hash_pandas_object(sample, index=False).to_numpy()
+    digest = hashlib.sha256(hashed.tobytes() + str(len(clinvar_df)).encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def build_clinvar_index(clinvar_df):
+    """
+    ClinVar tablosu için sıralı 64-bit anahtar indeksi oluşturur.
+    Dönüş: {"keys": sıralı uint64 dizisi, "rows": anahtarların satır konumları,
+            "n_rows": tablo uzunluğu, "version": anahtar sürümü,
+            "fingerprint": tablo parmak izi}
+    """
+    keys = variant_keys(clinvar_df)
+    order = np.argsort(keys, kind="stable")
+    logger.info(f"Built ClinVar index over {len(keys)} rows")
+    return {"keys": keys[order], "rows": order.astype(np.int64), "n_rows": len(keys),
+            "version": INDEX_VERSION, "fingerprint": table_fingerprint(clinvar_df)}
+
+
+def save_clinvar_index(index, path):
+    # Geçici dosyaya yazılıp yerine taşınır; indeksi bellek eşlemeli açmış
+    # diğer süreçler eski dosyayı okumaya devam eder
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, keys=index["keys"], rows=index["rows"], n_rows=index["n_rows"],
+                 version=index.get("version", INDEX_VERSION),
+                 fingerprint=np.uint64(index.get("fingerprint", 0)))
+    os.replace(tmp, path)
+
+
+def _mmap_npz(path):
+    """
+    Sıkıştırılmamış .npz içindeki dizileri kopyalamadan, salt okunur
+    np.memmap olarak açar. Aynı dosyayı açan süreçler işletim sisteminin
+    sayfa önbelleğini paylaşır.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    arrays[name] = np.load(member)
+                continue
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if not shape or 0 in shape or dtype.hasobject:
+                f.seek(info.header_offset + 30 + name_len + extra_len)
+                arrays[name] = np.lib.format.read_array(f)
+                continue
+            arrays[name] = np.memmap(f, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                     order="F" if fortran else "C")
+    return arrays
+
+
+def load_clinvar_index(path, mmap=False):
+    """
+    Kayıtlı indeksi yükler. mmap=True ise anahtar ve satır dizileri bellek
+    eşlemeli (salt okunur) açılır; süreç belleğine kopyalanmaz.
+    """
+    if mmap:
+        data = _mmap_npz(path)
+    else:
+        with np.load(path) as npz:
+            data = {name: npz[name] for name in npz.files}
+    return {"keys": data["keys"], "rows": data["rows"], "n_rows": int(data["n_rows"]),
+            "version": int(data["version"]) if "version" in data else 1,
+            "fingerprint": int(data["fingerprint"]) if "fingerprint" in data else None}
+
+
+def load_or_build_clinvar_index(clinvar_df, path=None, mmap=False):
+    """
+    Kayıtlı indeks varsa, tablo boyutu, anahtar sürümü ve tablo parmak izi
+    tutuyorsa onu yükler; yoksa indeksi oluşturup (path verilmişse) diske yazar.
+    mmap=True ise indeks bellek eşlemeli açılır (bkz. load_clinvar_index).
+    """
+    if path and os.path.exists(path):
+        try:
+            index = load_clinvar_index(path, mmap=mmap)
+            if (index["n_rows"] == len(clinvar_df) and index["version"] == INDEX_VERSION
+                    and index["fingerprint"] == table_fingerprint(clinvar_df)):
+                return index
+            logger.warning(f"ClinVar index {path} is stale, rebuilding")
+        except Exception as e:
+            logger.warning(f"Could not read ClinVar index {path}: {e}")
+
+    index = build_clinvar_index(clinvar_df)
+    if path:
+        try:
+            save_clinvar_index(index, path)
+            if mmap:
+                return load_clinvar_index(path, mmap=True)
+        except OSError as e:
+            logger.warning(f"Could not save ClinVar index to {path}: {e}")
+    return index
+
+
+# --- Sorgulama ---
+def lookup_clinvar_rows(index, clinvar_df, variants_df):
+    """
+    Yüklenen varyantları indekste toplu olarak arar.
+    Dönüş: (varyant_konumları, clinvar_konumları) eşleşen satır çiftleri.
+    Maliyet, ClinVar boyutuna değil yüklenen varyant sayısına bağlıdır.
+    """
+    # read_variants çıktısı zaten normalize edilmiştir; tekrar normalize edilmez
+    if variants_df.attrs.get("normalized"):
+        query = variants_df[KEY_COLUMNS]
+    else:
+        query = normalize_key_columns(variants_df)
+    keys = variant_keys(query, normalized=True)
+
+    lo = np.searchsorted(index["keys"], keys, side="left")
+    hi = np.searchsorted(index["keys"], keys, side="right")
+    counts = hi - lo
+    total = int(counts.sum())
+
+    left = np.repeat(np.arange(len(keys)), counts)
+    run_starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+    right = index["rows"][run_starts + np.arange(total)]
+
+    packed = is_packed(keys[left])
+    ok = np.ones(total, dtype=bool)
+    # Paketlenmiş SNV anahtarları kesindir; indeksin tabloyla uyuşmadığı duruma
+    # karşı yalnızca ucuz bir POS kontrolü yapılır. Ham POS tutmayan (ör. 100 AC>AT
+    # -> 101 C>T gibi normalizasyonla kayan) satırlar normalize POS ile yeniden denetlenir
+    query_pos = query["POS"].to_numpy()
+    cand = np.flatnonzero(packed)
+    cand = cand[clinvar_df["POS"].to_numpy()[right[cand]] != query_pos[left[cand]]]
+    if len(cand):
+        shifted = normalize_key_columns(clinvar_df.iloc[right[cand]])["POS"].to_numpy()
+        ok[cand] = shifted == query_pos[left[cand]]
+    if not ok.all():
+        logger.warning(f"ClinVar index does not match the table; dropped {int((~ok).sum())} matches")
+    hashed = np.flatnonzero(~packed)
+    if len(hashed):
+        # Hash anahtarlı eşleşmeler çakışmalara karşı gerçek değerlerle doğrulanır
+        hit = normalize_key_columns(clinvar_df.iloc[right[hashed]])
+        for c in KEY_COLUMNS:
+            ok[hashed] &= np.asarray(query[c].to_numpy()[left[hashed]] == hit[c].to_numpy(), dtype=bool)
+    if not ok.all():
+        left, right = left[ok], right[ok]
+    return left, right
+
+
+def join_clinvar(variants_df, clinvar_df, index):
+    """
+    `pd.merge(variants_df, clinvar_df, on=KEY_COLUMNS, how="left")` gibi çalışır;
+    ancak tüm ClinVar tablosunu taramak yerine indeksi kullanır ve anahtarları
+    normalize ederek karşılaştırır ("chr1" ile "1", kırpılmamış indeller eşleşir).
+    """
+    left, right = lookup_clinvar_rows(index, clinvar_df, variants_df)
+
+    # Her varyant satırı eşleşme sayısı kadar (eşleşmeyenler bir kez) tekrarlanır;
+    # `left` sıralı olduğundan çıktı sırası argsort gerektirmeden hesaplanır
+    counts = np.bincount(left, minlength=len(variants_df))
+    reps = np.maximum(counts, 1)
+    starts = np.cumsum(reps) - reps
+    all_left = np.repeat(np.arange(len(variants_df)), reps)
+    rank = np.arange(len(left)) - (np.cumsum(counts) - counts)[left]
+    source = np.full(len(all_left), -1, dtype=np.int64)
+    source[starts[left] + rank] = right
+
+    result = variants_df.iloc[all_left].reset_index(drop=True)
+    for c in clinvar_df.columns:
+        if c in KEY_COLUMNS:
+            continue
+        name = c
+        if c in result.columns:
+            # pd.merge'deki varsayılan son eklerle aynı davranış
+            result = result.rename(columns={c: f"{c}_x"})
+            name = f"{c}_y"
+        col = clinvar_df[c]
+        values = col.array if isinstance(col.dtype, pd.api.extensions.ExtensionDtype) else col.to_numpy()
+        # Sütun tipi korunur (categorical/Arrow dizeleri nesneye çevrilmez); eşleşmeyenler NA
+        result[name] = pd.api.extensions.take(values, source, allow_fill=True)
+    return result
@@ -1,12 +1,21 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import re
 import requests
 import logging
 import urllib.parse
 
+from disk_cache import get_cache
+from rate_limit import get_rate_limiter, get_circuit_breaker, call_with_retry, CircuitOpenError
+from variant_normalizer import normalize_contig
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+GNOMAD_API_URL = "https://gnomad.broadinstitute.org/api"
+
 
 # --- ClinVar INFO Parsers ---
 def extract_gene(info_str):
@@ -45,86 +54,271 @@ def extract_clnrevstat(info_str):
     return match.group(1).replace("_", " ") if match else None
 
 
+# --- Single-pass INFO extraction ---
+def _leading_match(values, pattern):
+    return pc.struct_field(pc.extract_regex(values, pattern), [0])
+
+
+def _underscores_to_spaces(values):
+    return pc.replace_substring(values, "_", " ")
+
+
+# Çıktı sütunu -> (INFO anahtarı, Arrow dizisi üzerinde son işlem)
+INFO_FIELDS = {
+    "GENE": ("GENEINFO", lambda v: _leading_match(v, r'^(?P<v>[A-Z0-9\-]+)')),
+    "CLNSIG": ("CLNSIG", None),
+    "DISEASE": ("CLNDN", _underscores_to_spaces),
+    "RS": ("RS", lambda v: _leading_match(v, r'^(?P<v>[0-9]+)')),
+    "CLNVC": ("CLNVC", None),
+    "CLNHGVS": ("CLNHGVS", None),
+    "CLNREVSTAT": ("CLNREVSTAT", _underscores_to_spaces),
+}
+DEFAULT_INFO_FIELDS = list(INFO_FIELDS)
+
+
+def extract_info_fields(info, fields=None):
+    """
+    INFO sütununu tek geçişte ';' ile bölüp istenen alanları sütun olarak döndürür.
+    `fields` içindeki adlar INFO_FIELDS'te tanımlı değilse ham INFO anahtarı
+    olarak kabul edilir (ör. "ORIGIN", "ALLELEID").
+    """
+    fields = list(fields or DEFAULT_INFO_FIELDS)
+    n = len(info)
+
+    arr = pa.array(info.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    parts = pc.split_pattern(arr, ";")
+    flat = pc.list_flatten(parts)
+    parent = pc.list_parent_indices(parts).to_numpy()
+
+    out = pd.DataFrame(index=info.index)
+    for name in fields:
+        key, post = INFO_FIELDS.get(name, (name, None))
+        prefix = key + "="
+        hit = np.flatnonzero(pc.starts_with(flat, prefix).to_numpy(zero_copy_only=False))
+        values = pc.utf8_slice_codeunits(flat.take(hit), len(prefix))
+        if post is not None:
+            values = post(values)
+
+        col = np.full(n, None, dtype=object)
+        col[parent[hit]] = values.to_numpy(zero_copy_only=False)
+        col[col == ""] = None
+        out[name] = col
+    return out
+
+
 # --- ClinVar Data Enrichment ---
-def enrich_clinvar_df(df):
-    df["GENE"] = df["INFO"].apply(extract_gene)
-    df["CLNSIG"] = df["INFO"].apply(extract_clnsig)
-    df["DISEASE"] = df["INFO"].apply(extract_disease)
-    df["RS"] = df["INFO"].apply(extract_rs)
-    df["CLNVC"] = df["INFO"].apply(extract_clnvc)
-    df["CLNHGVS"] = df["INFO"].apply(extract_clnhgvs)
-    df["CLNREVSTAT"] = df["INFO"].apply(extract_clnrevstat)
+def enrich_clinvar_df(df, fields=None):
+    """INFO'dan istenen alanları (varsayılan: DEFAULT_INFO_FIELDS) sütun olarak ekler."""
+    extracted = extract_info_fields(df["INFO"], fields)
+    for col in extracted.columns:
+        df[col] = extracted[col]
     return df
 
 
 # --- gnomAD Link Generator ---
-def add_gnomad_links(df, genome_build="GRCh37"):
-    def build_url(row):
-        chrom = str(row['CHROM']).replace("chr", "").strip()
-        pos = int(row['POS'])
-        ref = row['REF'].strip()
-        alt = row['ALT'].strip()
-        if not chrom or not ref or not alt:
-            return None
-        ds = "gnomad_r2_1" if genome_build == "GRCh37" else "gnomad_r4"
-        return f"https://gnomad.broadinstitute.org/variant/{chrom}-{pos}-{urllib.parse.quote(ref)}-{urllib.parse.quote(alt)}?dataset={ds}"
-
-    df["gnomAD_Link"] = df.apply(build_url, axis=1)
+GNOMAD_VARIANT_URL = "https://gnomad.broadinstitute.org/variant/"
+
+
+def _quote_unique(values):
+    """Sütundaki her farklı değeri bir kez URL-kodlar (alel sayısı satır sayısından çok azdır)."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    quoted = np.array([urllib.parse.quote(str(v)) for v in uniques], dtype=object)
+    return pd.Series(quoted[codes], index=values.index)
+
+
+def gnomad_links(df, genome_build="GRCh37"):
+    """
+    CHROM/POS/REF/ALT sütunlarından gnomAD varyant bağlantılarını sütun
+    işlemleriyle üretir. CHROM, REF ya da ALT boşsa bağlantı None olur.
+    Dönüş: df ile aynı indeksli Series.
+    """
+    if not len(df):
+        return pd.Series([], index=df.index, dtype=object)
+    chrom = df["CHROM"].astype(str).str.replace("chr", "", regex=False).str.strip()
+    ref = df["REF"].astype(str).str.strip()
+    alt = df["ALT"].astype(str).str.strip()
+    pos = df["POS"].astype("int64").astype(str)
+    ds = "gnomad_r2_1" if genome_build == "GRCh37" else "gnomad_r4"
+    links = (GNOMAD_VARIANT_URL + chrom + "-" + pos + "-" + _quote_unique(ref) + "-"
+             + _quote_unique(alt) + f"?dataset={ds}").astype(object)
+    empty = ((chrom == "") | (ref == "") | (alt == "")).to_numpy()
+    links[empty] = None
+    return links
+
+
+def add_gnomad_links(df, genome_build="GRCh37", lazy=False):
+    """
+    `gnomAD_Link` sütununu ekler (bkz. gnomad_links).
+    lazy=True ise sütun eklenmez; genom sürümü df.attrs["gnomad_build"]'e
+    yazılır ve bağlantılar yalnızca gösterilen satırlar için üretilir.
+    """
+    if lazy:
+        df.attrs["gnomad_build"] = genome_build
+        return df
+    df["gnomAD_Link"] = gnomad_links(df, genome_build)
     return df
 
 
 # --- gnomAD GraphQL API Handler ---
-def fetch_gnomad_simple(chrom, pos, ref, alt, genome_build="GRCh38"):
+GNOMAD_DATASETS = {"GRCh37": "gnomad_r2_1", "GRCh38": "gnomad_r4"}
+GNOMAD_BATCH_SIZE = 50
+GNOMAD_CACHE_TTL = 30 * 24 * 3600
+GNOMAD_CACHE_MAX_ENTRIES = 1_000_000
+GNOMAD_NO_DATA = 'No data returned'
+# gnomAD API isteği hız sınırı (istek/sn); 429 yanıtlarında Retry-After'a uyulur
+GNOMAD_REQUESTS_PER_SECOND = 2
+_GNOMAD_FIELDS = "exome { ac an faf95 { popmax popmax_population } }"
+
+# Bağlantıları yeniden kullanan ortak oturum
+_session = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+_session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+
+def gnomad_variant_id(chrom, pos, ref, alt):
+    chrom = normalize_contig(chrom)
+    if chrom == "MT":
+        # gnomAD mitokondri varyantlarını "M" kontigiyle adlandırır
+        chrom = "M"
+    return f"{chrom}-{int(pos)}-{str(ref).strip()}-{str(alt).strip()}"
+
+
+def _gnomad_stats(data):
+    if data is None:
+        return {'error': GNOMAD_NO_DATA}
+    ex = data.get("exome") or {}
+    faf = ex.get("faf95") or {}
+    return {
+        "Exome_AC": ex.get("ac"),
+        "Exome_AN": ex.get("an"),
+        "PopMax_AF": faf.get("popmax"),
+        "PopMax_Pop": faf.get("popmax_population"),
+    }
+
+
+def _gnomad_batch_query(count, dataset):
+    params = ", ".join(f"$v{i}: String!" for i in range(count))
+    fields = "\n".join(
+        f"  v{i}: variant(variantId: $v{i}, dataset: {dataset}) {{ {_GNOMAD_FIELDS} }}"
+        for i in range(count)
+    )
+    return f"query ({params}) {{\n{fields}\n}}"
+
+
+def get_gnomad_cache():
+    return get_cache("gnomad", ttl=GNOMAD_CACHE_TTL, max_entries=GNOMAD_CACHE_MAX_ENTRIES)
+
+
+def _gnomad_cache(cache):
+    if cache is False:
+        return None
+    if cache is None:
+        return get_gnomad_cache()
+    return cache
+
+
+def fetch_gnomad_batch(variants, genome_build="GRCh38", batch_size=GNOMAD_BATCH_SIZE, cache=None):
     """
-    CHROM, POS, REF, ALT bilgisiyle GraphQL üzerinden exome AC/AN ve popmax AF'yi çeker.
-    Dönüş: {
-      "Exome_AC": int,
-      "Exome_AN": int,
-      "PopMax_AF": float,
-      "PopMax_Pop": str
-    } ya da hata/eksikse {'error': str}
+    Çok sayıda varyantın gnomAD istatistiklerini, her istekte `batch_size` adet
+    takma adlı `variant(...)` alanı içeren GraphQL sorgularıyla çeker.
+    variants: (CHROM, POS, REF, ALT) demetleri.
+    Dönüş: girişle aynı sırada, fetch_gnomad_simple ile aynı biçimde sonuç listesi.
+
+    Sonuçlar (gnomAD'da bulunmayan varyantlar dahil) disk önbelleğine yazılır;
+    aynı varyantlar için sonraki çalıştırmalar ağa çıkmaz. cache=False önbelleği kapatır.
+    İstekler paylaşılan hız sınırı, yeniden deneme ve devre kesiciden geçer.
     """
-    url = "https://gnomad.broadinstitute.org/api"
-    query = """
-    query ($variantId: String!) {
-      variant(variantId: $variantId, dataset: gnomad_r4) {
-        exome {
-          ac
-          an
-          faf95 { popmax popmax_population }
-        }
-      }
-    }
+    dataset = GNOMAD_DATASETS.get(genome_build, "gnomad_r4")
+    vids = [gnomad_variant_id(*v) for v in variants]
+    cache = _gnomad_cache(cache)
+
+    results = {}
+    if cache is not None:
+        cached = cache.get_many(f"{dataset}:{vid}" for vid in vids)
+        results = {key.split(":", 1)[1]: value for key, value in cached.items()}
+
+    todo = [vid for vid in dict.fromkeys(vids) if vid not in results]
+    for start in range(0, len(todo), batch_size):
+        part = todo[start:start + batch_size]
+        fetched = _post_gnomad_batch(part, dataset)
+        results.update(fetched)
+        if cache is not None:
+            cache.set_many({
+                f"{dataset}:{vid}": value for vid, value in fetched.items()
+                if "error" not in value or value["error"] == GNOMAD_NO_DATA
+            })
+    return [results[vid] for vid in vids]
+
+
+def cached_gnomad_batch(variants, genome_build="GRCh38", cache=None):
     """
-    vid = f"{chrom}-{pos}-{ref}-{alt}"
+    Ağa çıkmadan, yalnızca önbellekteki gnomAD sonuçlarını döndürür.
+    Dönüş: girişle aynı sırada sonuç sözlükleri; önbellekte olmayanlar için None.
+    """
+    cache = _gnomad_cache(cache)
+    if cache is None:
+        return [None] * len(variants)
+    dataset = GNOMAD_DATASETS.get(genome_build, "gnomad_r4")
+    keys = [f"{dataset}:{gnomad_variant_id(*v)}" for v in variants]
+    found = cache.peek_many(keys)
+    return [found.get(key) for key in keys]
+
 
+def _post_gnomad_batch(vids, dataset):
+    query = _gnomad_batch_query(len(vids), dataset)
+    variables = {f"v{i}": vid for i, vid in enumerate(vids)}
     try:
-        resp = requests.post(url, json={"query": query, "variables": {"variantId": vid}}, timeout=20)
+        resp = call_with_retry(
+            lambda: _session.post(GNOMAD_API_URL, json={"query": query, "variables": variables}, timeout=30),
+            limiter=get_rate_limiter("gnomad", GNOMAD_REQUESTS_PER_SECOND, burst=GNOMAD_REQUESTS_PER_SECOND),
+            breaker=get_circuit_breaker("gnomad"),
+            name="gnomAD batch",
+        )
         resp.raise_for_status()
-        data = resp.json().get("data", {}).get("variant")
-
-        if data is None:
-            logger.warning(f"No data returned for gnomAD variant {vid}")
-            return {'error': 'No data returned'}
+        payload = resp.json()
+        data = payload.get("data")
+        if not isinstance(data, dict):
+            # Sorgu bütünüyle reddedildi (sunucu hatası, maliyet sınırı vb.); varyantlar
+            # hakkında bilgi yok, sonuç önbelleğe "veri yok" olarak yazılmamalı
+            messages = "; ".join(str(e.get("message", e)) for e in payload.get("errors") or []) or "no data"
+            logger.error(f"gnomAD batch query for {len(vids)} variants failed: {messages}")
+            return {vid: {'error': f"GraphQL error: {messages}"} for vid in vids}
+        out = {}
+        for i, vid in enumerate(vids):
+            if data.get(f"v{i}") is None:
+                logger.warning(f"No data returned for gnomAD variant {vid}")
+            out[vid] = _gnomad_stats(data.get(f"v{i}"))
+        return out
 
-        ex = data.get("exome", {})
-        faf = ex.get("faf95") or {}
-
-        return {
-            "Exome_AC": ex.get("ac"),
-            "Exome_AN": ex.get("an"),
-            "PopMax_AF": faf.get("popmax"),
-            "PopMax_Pop": faf.get("popmax_population"),
-        }
+    except CircuitOpenError as circuit_err:
+        logger.error(f"Skipping gnomAD request for {len(vids)} variants: {circuit_err}")
+        return {vid: {'error': f"Service unavailable: {circuit_err}"} for vid in vids}
 
     except requests.exceptions.RequestException as req_err:
-        logger.error(f"HTTP error fetching gnomAD stats for {vid}: {req_err}")
-        return {'error': f"HTTP error: {req_err}"}
+        logger.error(f"HTTP error fetching gnomAD stats for {len(vids)} variants: {req_err}")
+        return {vid: {'error': f"HTTP error: {req_err}"} for vid in vids}
 
     except ValueError as val_err:
-        logger.error(f"JSON decode error for gnomAD response {vid}: {val_err}")
-        return {'error': f"JSON decode error: {val_err}"}
+        logger.error(f"JSON decode error for gnomAD batch response: {val_err}")
+        return {vid: {'error': f"JSON decode error: {val_err}"} for vid in vids}
 
     except Exception as e:
-        logger.error(f"Unexpected error in gnomAD handler for {vid}: {e}")
+        logger.error(f"Unexpected error in gnomAD batch handler: {e}")
+        return {vid: {'error': f"Unexpected error: {e}"} for vid in vids}
+
+
+def fetch_gnomad_simple(chrom, pos, ref, alt, genome_build="GRCh38", cache=None):
+    """
+    CHROM, POS, REF, ALT bilgisiyle GraphQL üzerinden exome AC/AN ve popmax AF'yi çeker.
+    Dönüş: {
+      "Exome_AC": int,
+      "Exome_AN": int,
+      "PopMax_AF": float,
+      "PopMax_Pop": str
+    } ya da hata/eksikse {'error': str}
+    """
+    try:
+        return fetch_gnomad_batch([(chrom, pos, ref, alt)], genome_build, cache=cache)[0]
+    except Exception as e:
+        logger.error(f"Unexpected error in gnomAD handler for {chrom}-{pos}-{ref}-{alt}: {e}")
         return {'error': f"Unexpected error: {e}"}
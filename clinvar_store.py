@@ -0,0 +1,121 @@
+"""
+ClinVar VCF'ini zenginleştirilmiş, tipli ve kromozoma göre bölümlenmiş bir
+Parquet deposuna dönüştüren çevrimdışı derleme adımı ve depo yükleyicisi.
+
+Kullanım:
+    python clinvar_store.py clinvar.vcf.gz --out clinvar_store --build GRCh38
+"""
+import argparse
+import logging
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from clinvar_parser import enrich_clinvar_df, add_gnomad_links
+from clinvar_index import load_or_build_clinvar_index
+from vcf_reader import iter_vcf_chunks
+
+logger = logging.getLogger(__name__)
+
+# Tekrarlı değerler içeren sütunlar sözlük (categorical) olarak okunur
+CATEGORICAL_COLUMNS = ["GENE", "CLNSIG", "CLNREVSTAT", "CLNVC"]
+STORE_ROW_GROUP_SIZE = 32_768
+INDEX_FILENAME = "_clinvar_index.npz"  # "_" önekli dosyalar Parquet okuyucusu tarafından atlanır
+
+
+def _typed_chunk(chunk, genome_build):
+    chunk = enrich_clinvar_df(chunk).drop(columns=["INFO"])
+    chunk = add_gnomad_links(chunk, genome_build=genome_build)
+    chunk["ID"] = pd.to_numeric(chunk["ID"], errors="coerce").astype("Int64")
+    schema = pa.schema([
+        (col, pa.int64() if col in ("POS", "ID") else pa.string()) for col in chunk.columns
+    ])
+    return pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+
+
+def build_clinvar_store(vcf_path, out_dir, genome_build="GRCh38", chunksize=500_000):
+    """
+    ClinVar VCF'ini parça parça okuyup INFO alanlarını çıkarır ve
+    `out_dir/CHROM=<kromozom>/` altında Parquet dosyaları olarak yazar.
+    Derleme sonunda eşleştirme indeksi de depoya kaydedilir.
+    """
+    start = time.perf_counter()
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+
+    columns = ["CHROM", "POS", "ID", "REF", "ALT", "INFO"]
+    tables = (_typed_chunk(c, genome_build) for c in iter_vcf_chunks(vcf_path, columns, chunksize))
+    first = next(tables, None)
+    if first is None:
+        raise ValueError(f"{vcf_path} içinde varyant kaydı bulunamadı")
+
+    def batches():
+        yield from first.to_batches()
+        for table in tables:
+            yield from table.to_batches()
+
+    ds.write_dataset(
+        batches(),
+        out_dir,
+        schema=first.schema,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("CHROM", pa.string())]), flavor="hive"),
+        existing_data_behavior="overwrite_or_ignore",
+        # ClinVar VCF konuma göre sıralı olduğundan küçük satır grupları, POS
+        # istatistikleriyle bölge sorgularında yalnızca ilgili grupların okunmasını sağlar
+        min_rows_per_group=STORE_ROW_GROUP_SIZE,
+        max_rows_per_group=STORE_ROW_GROUP_SIZE,
+    )
+
+    df = load_clinvar_store(out_dir)
+    load_or_build_clinvar_index(df, os.path.join(out_dir, INDEX_FILENAME))
+    logger.info(f"Built ClinVar store {out_dir} with {len(df)} rows in {time.perf_counter() - start:.1f}s")
+    return out_dir
+
+
+def load_clinvar_store(store_dir, chroms=None, regions=None):
+    """
+    Depoyu okuyarak DataFrame döndürür. Parquet dosyaları bellek eşlemeli
+    okunur, ancak çözülen sütunlar DataFrame'e bir kez kopyalanır; süreç
+    içindeki paylaşım shared_resources önbelleğiyle sağlanır.
+    GENE/CLNSIG/CLNREVSTAT/CLNVC ve CHROM sütunları categorical gelir.
+    `chroms` verilirse yalnızca o kromozom bölümleri okunur.
+    `regions` (CHROM/START/END, 1 tabanlı) verilirse yalnızca bu bölgelerle
+    çakışan satır grupları okunur.
+    """
+    filters = [("CHROM", "in", [str(c) for c in chroms])] if chroms else None
+    if regions is not None:
+        filters = [
+            [("CHROM", "=", str(chrom)), ("POS", ">=", int(start)), ("POS", "<=", int(end))]
+            for chrom, start, end in regions[["CHROM", "START", "END"]].itertuples(index=False)
+        ] or [[("CHROM", "=", "")]]
+    table = pq.read_table(
+        store_dir,
+        memory_map=True,
+        read_dictionary=CATEGORICAL_COLUMNS,
+        filters=filters,
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+    )
+    # Arrow tablosu dönüşüm sırasında sütun sütun bırakılır; tepe bellek tek kopya kadardır
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    return df[["CHROM"] + [c for c in df.columns if c != "CHROM"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClinVar VCF'inden Parquet deposu oluşturur.")
+    parser.add_argument("vcf", help="ClinVar VCF veya VCF.gz dosyası")
+    parser.add_argument("--out", default="clinvar_store", help="Çıktı dizini")
+    parser.add_argument("--build", default="GRCh38", choices=["GRCh37", "GRCh38"])
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    args = parser.parse_args()
+    build_clinvar_store(args.vcf, args.out, genome_build=args.build, chunksize=args.chunksize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("GENETIK_CACHE_DIR", ".cache")
+CACHE_FILENAME = "annotations.sqlite"
+
+_MISSING = object()
+
+
+class DiskCache:
+    """
+    SQLite tabanlı, süreçler ve oturumlar arasında paylaşılan anahtar-değer önbelleği.
+    Değerler JSON olarak saklanır. Her kaydın bir geçerlilik süresi (TTL) vardır;
+    kayıt sayısı `max_entries`'i aşınca en uzun süredir kullanılmayanlar silinir.
+    Aynı dosya birden çok `namespace` (ör. "gnomad", "pubmed") tarafından paylaşılabilir.
+    """
+
+    def __init__(self, path, namespace, ttl=None, max_entries=None):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires REAL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (namespace, accessed)")
+        self._conn.commit()
+
+    def _select(self, keys, now):
+        found = {}
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            marks = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"SELECT key, value FROM cache WHERE namespace = ? AND key IN ({marks}) "
+                f"AND (expires IS NULL OR expires > ?)",
+                (self.namespace, *part, now),
+            ).fetchall()
+            found.update((k, json.loads(v)) for k, v in rows)
+        return found
+
+    def get_many(self, keys):
+        """Bulunan (süresi dolmamış) kayıtları {anahtar: değer} olarak döndürür."""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            found = self._select(keys, now)
+            if found:
+                self._conn.executemany(
+                    "UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?",
+                    [(now, self.namespace, k) for k in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        metrics.record_cache(self.namespace, hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def peek_many(self, keys):
+        """
+        `get_many` gibi, ancak isabet/ıska sayaçlarını ve son erişim zamanını
+        değiştirmez; ağa çıkmadan önbellekte ne olduğuna bakmak için.
+        """
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            return self._select(keys, time.time())
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items, ttl=_MISSING):
+        """{anahtar: değer} kayıtlarını yazar; `ttl` verilmezse varsayılan TTL kullanılır."""
+        ttl = self.ttl if ttl is _MISSING else ttl
+        now = time.time()
+        expires = now + ttl if ttl else None
+        rows = [(self.namespace, k, json.dumps(v), expires, now) for k, v in dict(items).items()]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._writes += len(rows)
+            if self.max_entries and self._writes >= max(1, self.max_entries // 10):
+                self._evict(now)
+                self._writes = 0
+            self._conn.commit()
+
+    def set(self, key, value, ttl=_MISSING):
+        self.set_many({key: value}, ttl=ttl)
+
+    def _evict(self, now):
+        self._conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires IS NOT NULL AND expires <= ?",
+            (self.namespace, now),
+        )
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE rowid IN ("
+                "SELECT rowid FROM cache WHERE namespace = ? ORDER BY accessed LIMIT ?)",
+                (self.namespace, excess),
+            )
+            logger.info(f"Evicted {excess} entries from '{self.namespace}' cache")
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace, ttl=None, max_entries=None, path=None):
+    """Süreç içinde namespace başına tek bir DiskCache örneği döndürür."""
+    path = path or os.path.join(CACHE_DIR, CACHE_FILENAME)
+    with _caches_lock:
+        cache = _caches.get((path, namespace))
+        if cache is None:
+            cache = DiskCache(path, namespace, ttl=ttl, max_entries=max_entries)
+            _caches[(path, namespace)] = cache
+        return cache
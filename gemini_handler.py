@@ -1,26 +1,205 @@
 # === gemini_handler.py ===
 
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+
 import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+from disk_cache import get_cache
+from rate_limit import get_rate_limiter, get_circuit_breaker, call_with_retry
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = "gemini-1.5-flash"
+GEMINI_BATCH_SIZE = 5
+GEMINI_CACHE_TTL = 90 * 24 * 3600
+GEMINI_CACHE_MAX_ENTRIES = 200_000
+# Hesabın dakikalık istek kotası; 429 (ResourceExhausted) yanıtlarında ayrıca geri çekilinir
+GEMINI_REQUESTS_PER_MINUTE = int(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", 2000))
+
+# genai.configure süreç genelidir; yalnızca anahtar değiştiğinde yeniden yapılandırılır.
+# Model nesneleri istemcilerini aynı kilit altında alır; başka bir oturumun anahtarına bağlanamaz
+_configure_lock = threading.Lock()
+_configured_key = None
+
+
+def get_gemini_cache():
+    return get_cache("gemini", ttl=GEMINI_CACHE_TTL, max_entries=GEMINI_CACHE_MAX_ENTRIES)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Boşluk farklılıklarını yok sayar: satırları kırpar, boşlukları teke indirir."""
+    lines = (" ".join(line.split()) for line in prompt.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def prompt_cache_key(prompt: str, model_name: str = GEMINI_MODEL) -> str:
+    """Model adı ve normalize edilmiş prompt'un SHA-256 özeti."""
+    payload = f"{model_name}\n{normalize_prompt(prompt)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _generative_client(api_key):
+    """`api_key` ile yapılandırılmış GenerativeService istemcisi."""
+    global _configured_key
+    with _configure_lock:
+        if _configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+        return genai_client.get_default_generative_client()
+
+
+def _batch_prompt(items):
+    """Birden çok varyant prompt'unu JSON çıktı isteyen tek bir istekte birleştirir."""
+    parts = [
+        f"You will receive {len(items)} independent variant interpretation tasks.",
+        "Answer each task separately and completely, exactly as if it were asked on its own.",
+        'Return ONLY a JSON array with one object per task: [{"id": "<task id>", "answer": "<answer text>"}].',
+        "",
+    ]
+    for task_id, prompt in items:
+        parts.append(f"### TASK id={task_id}")
+        parts.append(prompt.strip())
+        parts.append("")
+    return "\n".join(parts)
+
+
+def _parse_batch_response(text, ids):
+    """Toplu yanıtı {görev id: yanıt} sözlüğüne çevirir; biçim bozuksa ValueError."""
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("results") or data.get("tasks") or [data]
+    answers = {}
+    for item in data:
+        if isinstance(item, dict) and str(item.get("id")) in ids and item.get("answer"):
+            answers[str(item["id"])] = str(item["answer"])
+    if not answers:
+        raise ValueError("Toplu yanıtta hiçbir görev bulunamadı")
+    return answers
+
+
+class GeminiClient:
+    """
+    API anahtarı başına bir kez yapılandırılan, model nesnesini yeniden kullanan
+    Gemini istemcisi. Yanıtlar model + normalize prompt anahtarıyla önbelleklenir.
+    """
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL, cache=None):
+        if not api_key:
+            raise ValueError(
+                "Gemini API anahtarı bulunamadı. "
+                "Lütfen sidebar’dan kendi anahtarınızı girin."
+            )
+        self.api_key = api_key
+        self.model_name = model_name
+        self.cache = get_gemini_cache() if cache is None else (cache or None)
+        self._model = genai.GenerativeModel(model_name=model_name)
+        # GenerativeModel istemcisini ilk istekte süreç genelindeki varsayılandan
+        # alır; burada anahtara özel istemci hemen bağlanır
+        self._model._client = _generative_client(api_key)
+        self._json_config = genai.GenerationConfig(response_mime_type="application/json")
+
+    def _call(self, prompt, **kwargs):
+        rate = GEMINI_REQUESTS_PER_MINUTE / 60
+        response = call_with_retry(
+            lambda: self._model.generate_content(prompt, **kwargs),
+            limiter=get_rate_limiter("gemini", rate, burst=max(1, int(rate))),
+            breaker=get_circuit_breaker("gemini"),
+            name="Gemini request",
+        )
+        return response.text
+
+    def generate(self, prompt, cache=None):
+        cache = self.cache if cache is None else (cache or None)
+        key = prompt_cache_key(prompt, self.model_name)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        return self._generate_uncached(prompt, key, cache)
+
+    def _generate_uncached(self, prompt, key, cache):
+        """Önbelleğe bakmadan yanıt üretir; başarılı yanıtı `cache`'e yazar."""
+        try:
+            text = self._call(prompt)
+        except Exception as e:
+            return f"❌ Hata oluştu: {e}"
+
+        if not text:
+            return "🛑 Yanıt alınamadı."
+        if cache is not None:
+            cache.set(key, text)
+        return text
+
+    def generate_batch(self, prompts, batch_size=GEMINI_BATCH_SIZE, cache=None):
+        """
+        Prompt listesini `batch_size`'lık gruplar halinde tek isteklerle yorumlatır.
+        Yanıt JSON olarak ayrıştırılamazsa ya da bir görev eksikse o prompt'lar
+        tek tek `generate` ile istenir. Dönüş: girişle aynı sırada yanıt listesi.
+        """
+        cache = self.cache if cache is None else (cache or None)
+        keys = [prompt_cache_key(p, self.model_name) for p in prompts]
+        answers = cache.get_many(keys) if cache is not None else {}
+
+        todo = [i for i, k in enumerate(keys) if k not in answers]
+        for start in range(0, len(todo), max(1, batch_size)):
+            part = todo[start:start + max(1, batch_size)]
+            ids = {str(i): i for i in part}
+            try:
+                text = self._call(
+                    _batch_prompt([(tid, prompts[i]) for tid, i in ids.items()]),
+                    generation_config=self._json_config,
+                )
+                parsed = _parse_batch_response(text, ids)
+            except Exception as e:
+                logger.warning(f"Gemini batch of {len(part)} failed, falling back to single calls: {e}")
+                parsed = {}
 
-def generate_with_gemini(prompt: str, api_key: str = None) -> str:
+            fresh = {keys[ids[tid]]: answer for tid, answer in parsed.items()}
+            answers.update(fresh)
+            if cache is not None and fresh:
+                cache.set_many(fresh)
+            for i in part:
+                if keys[i] not in answers:
+                    # Iska get_many'de zaten sayıldı; önbelleğe tekrar bakılmaz
+                    answers[keys[i]] = self._generate_uncached(prompts[i], keys[i], cache)
+        return [answers[k] for k in keys]
+
+
+@lru_cache(maxsize=32)
+def get_gemini_client(api_key, model_name=GEMINI_MODEL):
+    """Aynı anahtar ve model için süreç içinde tek bir GeminiClient döndürür."""
+    return GeminiClient(api_key, model_name)
+
+
+def generate_with_gemini(prompt: str, api_key: str = None, model_name: str = GEMINI_MODEL,
+                         cache=None) -> str:
     """
     Gemini 1.5 Flash modeli ile içerik üretir.
     Sadece fonksiyona parametre olarak gelen api_key kullanılır;
     eğer api_key yoksa hata fırlatılır.
+    Aynı model ve (normalize edilmiş) prompt için önceki yanıt disk
+    önbelleğinden döndürülür; cache=False önbelleği kapatır.
     """
     if not api_key:
         raise ValueError(
             "Gemini API anahtarı bulunamadı. "
             "Lütfen sidebar’dan kendi anahtarınızı girin."
         )
+    return get_gemini_client(api_key, model_name).generate(prompt, cache=cache)
 
-    # Sadece kullanıcıdan gelen anahtar ile yapılandır
-    genai.configure(api_key=api_key)
 
-    # Model örneğini oluştur ve içeriği üret
-    model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-    try:
-        response = model.generate_content(prompt)
-        return response.text or "🛑 Yanıt alınamadı."
-    except Exception as e:
-        return f"❌ Hata oluştu: {e}"
\ No newline at end of file
+def generate_batch_with_gemini(prompts, api_key: str = None, batch_size: int = GEMINI_BATCH_SIZE,
+                               model_name: str = GEMINI_MODEL, cache=None):
+    """Birden çok prompt'u toplu isteklerle yorumlatır; bkz. GeminiClient.generate_batch."""
+    if not api_key:
+        raise ValueError(
+            "Gemini API anahtarı bulunamadı. "
+            "Lütfen sidebar’dan kendi anahtarınızı girin."
+        )
+    return get_gemini_client(api_key, model_name).generate_batch(prompts, batch_size, cache=cache)
@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Gecikme histogramı kova üst sınırları (sn)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Uygulamanın izlenen aşamaları (gösterim sırası)
+STAGES = ["parse", "normalize", "clinvar_merge", "clingen_lookup", "pubmed", "gnomad", "gemini", "render"]
+
+
+class MetricsRegistry:
+    """
+    Aşama başına gecikme histogramı, hata sayısı ve işlenen öğe sayısını;
+    önbellek başına isabet/ıska sayılarını tutan hafif, iş parçacığı güvenli kayıt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self._caches = {}
+            self._started = time.time()
+
+    def _stage(self, name):
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = {
+                "count": 0, "errors": 0, "items": 0, "seconds": 0.0, "max": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        return stage
+
+    def observe(self, name, seconds, items=1, error=False):
+        with self._lock:
+            stage = self._stage(name)
+            stage["count"] += 1
+            stage["items"] += items
+            stage["seconds"] += seconds
+            stage["max"] = max(stage["max"], seconds)
+            stage["errors"] += int(error)
+            i = 0
+            while i < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[i]:
+                i += 1
+            stage["buckets"][i] += 1
+
+    def record_error(self, name, count=1):
+        with self._lock:
+            self._stage(name)["errors"] += count
+
+    def record_cache(self, name, hits=0, misses=0):
+        with self._lock:
+            cache = self._caches.setdefault(name, {"hits": 0, "misses": 0})
+            cache["hits"] += hits
+            cache["misses"] += misses
+
+    @contextmanager
+    def timer(self, name, items=1):
+        """
+        Bloğun süresini `name` aşamasına yazar; istisna olursa hata sayılır.
+        Öğe sayısı blok içinde bilinirse `span["items"]` ile güncellenebilir.
+        """
+        span = {"items": items}
+        start = time.perf_counter()
+        error = False
+        try:
+            yield span
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, items=span["items"], error=error)
+
+    @staticmethod
+    def _quantile(stage, q):
+        target = q * stage["count"]
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), stage["buckets"]):
+            seen += n
+            if seen >= target and n:
+                return min(bound, stage["max"])
+        return stage["max"]
+
+    def snapshot(self):
+        """Tüm ölçümlerin JSON'a çevrilebilir özeti."""
+        with self._lock:
+            stages = {
+                name: {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "items": s["items"],
+                    "seconds": round(s["seconds"], 6),
+                    "mean": s["seconds"] / s["count"] if s["count"] else 0.0,
+                    "p50": self._quantile(s, 0.5),
+                    "p95": self._quantile(s, 0.95),
+                    "max": s["max"],
+                    "items_per_sec": s["items"] / s["seconds"] if s["seconds"] else 0.0,
+                    "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], s["buckets"])),
+                }
+                for name, s in self._stages.items()
+            }
+            caches = {
+                name: {**c, "hit_rate": c["hits"] / (c["hits"] + c["misses"]) if c["hits"] + c["misses"] else 0.0}
+                for name, c in self._caches.items()
+            }
+            return {"since": self._started, "stages": stages, "caches": caches}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix="genetik"):
+        """Prometheus metin biçimi (exposition format) çıktısı."""
+        snap = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Stage latency in seconds.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, s in snap["stages"].items():
+            cumulative = 0
+            for bound, n in s["buckets"].items():
+                cumulative += n
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {s["seconds"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        lines += [f"# HELP {prefix}_stage_errors_total Stage errors.", f"# TYPE {prefix}_stage_errors_total counter"]
+        lines += [f'{prefix}_stage_errors_total{{stage="{n}"}} {s["errors"]}' for n, s in snap["stages"].items()]
+        lines += [f"# HELP {prefix}_stage_items_total Items processed per stage.",
+                  f"# TYPE {prefix}_stage_items_total counter"]
+        lines += [f'{prefix}_stage_items_total{{stage="{n}"}} {s["items"]}' for n, s in snap["stages"].items()]
+        lines += [f"# HELP {prefix}_cache_requests_total Cache lookups by result.",
+                  f"# TYPE {prefix}_cache_requests_total counter"]
+        for name, c in snap["caches"].items():
+            lines.append(f'{prefix}_cache_requests_total{{cache="{name}",result="hit"}} {c["hits"]}')
+            lines.append(f'{prefix}_cache_requests_total{{cache="{name}",result="miss"}} {c["misses"]}')
+        return "\n".join(lines) + "\n"
+
+
+# Süreç genelindeki varsayılan kayıt
+metrics = MetricsRegistry()
@@ -1,39 +1,109 @@
+import os
+
 import requests
 import logging
 
+from disk_cache import get_cache
+from rate_limit import get_rate_limiter, get_circuit_breaker, call_with_retry, CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
-def get_pubmed_ids_from_clinvar(variation_id):
-    url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/elink.fcgi"
-    params = {
-        "dbfrom": "clinvar",
-        "db": "pubmed",
-        "id": variation_id,
-        "retmode": "json"
-    }
+ELINK_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/elink.fcgi"
+NCBI_API_KEY = os.environ.get("NCBI_API_KEY")
+
+# NCBI eutils sınırları: anahtarsız 3 istek/sn, anahtarla 10 istek/sn
+EUTILS_RATE_NO_KEY = 3
+EUTILS_RATE_WITH_KEY = 10
+ELINK_BATCH_SIZE = 200
+PUBMED_CACHE_TTL = 7 * 24 * 3600
+PUBMED_CACHE_MAX_ENTRIES = 1_000_000
+
+_session = requests.Session()
+
+
+def get_pubmed_cache():
+    return get_cache("pubmed", ttl=PUBMED_CACHE_TTL, max_entries=PUBMED_CACHE_MAX_ENTRIES)
+
+
+def _pubmed_cache(cache):
+    if cache is False:
+        return None
+    if cache is None:
+        return get_pubmed_cache()
+    return cache
+
+
+def get_pubmed_ids_batch(variation_ids, api_key=None, batch_size=ELINK_BATCH_SIZE,
+                         cache=None, requests_per_second=None):
+    """
+    ClinVar Variation ID'leri için PubMed ID'lerini toplu elink istekleriyle çeker.
+    Her istek `batch_size` adede kadar `id=` parametresi taşır; NCBI her ID için
+    ayrı bir linkset döndürür ve sonuçlar buna göre ID'lere dağıtılır.
+    Dönüş: girişle aynı sırada, her ID için PMID listesi ya da {'error': str}.
+
+    İstek hızı varsayılan olarak anahtarsız 3/sn, anahtarla 10/sn ile sınırlanır;
+    429/5xx yanıtları Retry-After ve jitter'lı üstel beklemeyle yeniden denenir.
+    Yalnızca önbellekte olmayan ID'ler için beklenir. Sonuçlar (bağlantısı olmayan ID'ler dahil) paylaşılan disk önbelleğine yazılır.
+    """
+    api_key = api_key or NCBI_API_KEY
+    rate = requests_per_second or (EUTILS_RATE_WITH_KEY if api_key else EUTILS_RATE_NO_KEY)
+    limiter = get_rate_limiter("eutils", rate, burst=rate)
+    ids = [str(v) for v in variation_ids]
+    cache = _pubmed_cache(cache)
+
+    results = cache.get_many(ids) if cache is not None else {}
+    todo = [vid for vid in dict.fromkeys(ids) if vid not in results]
+    for start in range(0, len(todo), batch_size):
+        part = todo[start:start + batch_size]
+        fetched = _post_elink(part, api_key, limiter)
+        results.update(fetched)
+        if cache is not None:
+            cache.set_many({vid: pmids for vid, pmids in fetched.items() if isinstance(pmids, list)})
+    return [results[vid] for vid in ids]
+
+
+def _post_elink(ids, api_key, limiter=None):
+    params = [("dbfrom", "clinvar"), ("db", "pubmed"), ("retmode", "json")]
+    if api_key:
+        params.append(("api_key", api_key))
+    params.extend(("id", vid) for vid in ids)
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = call_with_retry(
+            lambda: _session.post(ELINK_URL, data=params, timeout=30),
+            limiter=limiter, breaker=get_circuit_breaker("eutils"), name="PubMed elink",
+        )
         response.raise_for_status()
         data = response.json()
-        linksets = data.get("linksets", [])
-        if not linksets or "linksetdbs" not in linksets[0]:
-            logger.warning(f"No PubMed links found for ClinVar ID {variation_id}")
-            return []
-        pmids = []
-        for db in linksets[0]["linksetdbs"]:
-            if db["dbto"] == "pubmed":
-                pmids.extend(db["links"])
-        return pmids
+        found = {vid: [] for vid in ids}
+        for linkset in data.get("linksets", []):
+            pmids = []
+            for db in linkset.get("linksetdbs", []):
+                if db.get("dbto") == "pubmed":
+                    pmids.extend(db.get("links", []))
+            for vid in linkset.get("ids", []):
+                if str(vid) in found:
+                    found[str(vid)].extend(str(p) for p in pmids)
+        missing = sum(1 for pmids in found.values() if not pmids)
+        if missing:
+            logger.warning(f"No PubMed links found for {missing} of {len(ids)} ClinVar IDs")
+        return found
+    except CircuitOpenError as circuit_err:
+        logger.error(f"Skipping PubMed request for {len(ids)} ClinVar IDs: {circuit_err}")
+        return {vid: {'error': f"Service unavailable: {circuit_err}"} for vid in ids}
     except requests.exceptions.RequestException as req_err:
-        logger.error(f"HTTP error fetching PubMed IDs for {variation_id}: {req_err}")
-        return {'error': f"HTTP error: {req_err}"}
+        logger.error(f"HTTP error fetching PubMed IDs for {len(ids)} ClinVar IDs: {req_err}")
+        return {vid: {'error': f"HTTP error: {req_err}"} for vid in ids}
     except ValueError as val_err:
-        logger.error(f"JSON decode error for PubMed response {variation_id}: {val_err}")
-        return {'error': f"JSON decode error: {val_err}"}
+        logger.error(f"JSON decode error for PubMed batch response: {val_err}")
+        return {vid: {'error': f"JSON decode error: {val_err}"} for vid in ids}
     except Exception as e:
-        logger.error(f"Unexpected error in PubMed handler for {variation_id}: {e}")
-        return {'error': f"Unexpected error: {e}"}
+        logger.error(f"Unexpected error in PubMed batch handler: {e}")
+        return {vid: {'error': f"Unexpected error: {e}"} for vid in ids}
+
+
+def get_pubmed_ids_from_clinvar(variation_id, api_key=None, cache=None):
+    return get_pubmed_ids_batch([variation_id], api_key=api_key, cache=cache)[0]
 
 
 def build_pubmed_links(pmid_list):
-    return [f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" for pmid in pmid_list]
\ No newline at end of file
+    return [f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" for pmid in pmid_list]
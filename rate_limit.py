@@ -0,0 +1,231 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Yeniden denenebilir HTTP durumları: hız sınırı ve geçici sunucu hataları
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class RateLimiter:
+    """
+    Token bucket: saniyede ortalama `rate` isteğe, anlık olarak en fazla
+    `burst` isteğe izin verir. İş parçacıkları arasında paylaşılabilir.
+    Sunucu Retry-After ile beklemeyi isterse `pause` tüm çağıranları durdurur.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def wait(self):
+        if not self.rate or self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._paused_until, self._updated)
+            self._tokens = min(self.burst, self._tokens + (start - self._updated) * self.rate)
+            self._updated = start
+            self._tokens -= 1
+            delay = start - now
+            if self._tokens < 0:
+                # Jeton borcu: sıradaki jetonun üretileceği ana kadar beklenir
+                delay += -self._tokens / self.rate
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Sonraki tüm istekleri en az `seconds` saniye erteler; kova boşaltılır."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = 0.0
+                self._updated = until
+
+
+class CircuitOpenError(RuntimeError):
+    """Devre açıkken (servis art arda başarısız olduğunda) yapılan çağrılar."""
+
+
+class CircuitBreaker:
+    """
+    Art arda `failure_threshold` geçici hatadan sonra devreyi açar; açık
+    devre `reset_timeout` saniye boyunca çağrıları ağa çıkmadan reddeder.
+    Süre dolunca tek bir deneme çağrısına izin verilir (yarı açık); başarılı
+    olursa devre kapanır, başarısız olursa yeniden açılır.
+    """
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def check(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining <= 0 and not self._trial:
+                self._trial = True
+                return
+        raise CircuitOpenError(f"{self.name} circuit open; retrying in {max(remaining, 0):.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial:
+                    logger.warning(f"Opening {self.name} circuit after {self._failures} failures")
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+def retry_after_seconds(value):
+    """Retry-After başlığını (saniye ya da HTTP tarihi) saniyeye çevirir."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _status_of(error):
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        # google.api_core istisnaları HTTP durumunu `code` olarak taşır
+        status = getattr(error, "code", None)
+    return status if isinstance(status, int) else None
+
+
+def _is_transient(error):
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return _status_of(error) in RETRY_STATUSES
+
+
+def backoff_delay(attempt, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF):
+    """Tam jitter'lı üstel bekleme: [0, min(max_backoff, backoff * 2^attempt)]."""
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+
+def call_with_retry(fn, limiter=None, breaker=None, retries=DEFAULT_RETRIES,
+                    backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF, name="request"):
+    """
+    `fn()`'i hız sınırı, yeniden deneme ve devre kesici ile çağırır.
+    - Her deneme öncesi `limiter` jetonu beklenir (önbellek isabetleri bu
+      fonksiyona hiç gelmediğinden beklemez).
+    - `fn` bir HTTP yanıtı döndürürse 429/5xx durumları, istisna fırlatırsa
+      bağlantı/zaman aşımı ve 429/5xx kodlu hatalar geçici sayılır ve jitter'lı
+      üstel beklemeyle `retries` kez yeniden denenir. Retry-After başlığı varsa
+      ona uyulur ve aynı limiter'ı kullanan tüm çağrılar da bekletilir.
+    - Geçici hatalar `breaker`'a işlenir; devre açıksa CircuitOpenError fırlatılır.
+    Denemeler tükenince son yanıt döndürülür ya da son istisna fırlatılır.
+    """
+    for attempt in range(retries + 1):
+        if breaker is not None:
+            breaker.check()
+        if limiter is not None:
+            limiter.wait()
+        try:
+            result = fn()
+        except Exception as e:
+            if not _is_transient(e):
+                # Servis yanıt verdi (ör. 400); devre açısından başarılı sayılır
+                if breaker is not None:
+                    breaker.record_success()
+                raise
+            error, status = e, _status_of(e)
+            response = getattr(e, "response", None)
+        else:
+            status = getattr(result, "status_code", None)
+            if status not in RETRY_STATUSES:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
+            error, response = None, result
+
+        if breaker is not None:
+            breaker.record_failure()
+        headers = getattr(response, "headers", None) or {}
+        retry_after = retry_after_seconds(headers.get("Retry-After"))
+        if attempt == retries:
+            logger.warning(f"{name} failed after {retries + 1} attempts (status {status})")
+            if error is not None:
+                raise error
+            return result
+        if breaker is not None:
+            # Devre bu hatayla açıldıysa beklemeden vazgeçilir
+            breaker.check()
+        if retry_after is not None:
+            delay = min(retry_after, max_backoff)
+            if limiter is not None:
+                limiter.pause(delay)
+        else:
+            delay = backoff_delay(attempt, backoff, max_backoff)
+        logger.info(f"Retrying {name} in {delay:.2f}s (attempt {attempt + 1}/{retries}, status {status})")
+        time.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_breakers = {}
+
+
+def get_rate_limiter(name, rate, burst=1):
+    """Süreç içinde (ad, hız) başına tek bir RateLimiter döndürür."""
+    with _limiters_lock:
+        limiter = _limiters.get((name, rate))
+        if limiter is None:
+            limiter = _limiters[(name, rate)] = RateLimiter(rate, burst)
+        return limiter
+
+
+def get_circuit_breaker(name, **kwargs):
+    """Süreç içinde servis adı başına tek bir CircuitBreaker döndürür."""
+    with _limiters_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
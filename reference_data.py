@@ -0,0 +1,102 @@
+import logging
+import os
+
+import pandas as pd
+
+from bgzf_index import CORRUPT_INPUT_ERRORS
+from clinvar_parser import enrich_clinvar_df, add_gnomad_links, gnomad_links
+from clinvar_index import load_or_build_clinvar_index, join_clinvar
+from clinvar_store import load_clinvar_store, INDEX_FILENAME as STORE_INDEX_FILENAME
+from clingen_handler import (
+    load_clingen_validity, build_clingen_index, lookup_clingen, format_clingen_curations,
+)
+from metrics import metrics
+from regions import in_regions, read_vcf_regions
+from variant_normalizer import normalize_variants
+from vcf_reader import read_vcf
+
+logger = logging.getLogger(__name__)
+
+CLINVAR_STORE_DIR = os.environ.get("CLINVAR_STORE", "clinvar_store")
+CLINVAR_SAMPLE_PATH = "sampled_100.parquet"
+CLINGEN_PATH = "Clingen-Gene-Disease-Summary-2025-07-01.csv"
+REQUIRED_COLUMNS = ["CHROM", "POS", "REF", "ALT"]
+
+
+def load_reference_data(store_dir=CLINVAR_STORE_DIR, sample_path=CLINVAR_SAMPLE_PATH,
+                        clingen_path=CLINGEN_PATH, mmap_index=False):
+    """
+    ClinVar tablosunu, eşleştirme indeksini ve ClinGen indeksini yükler.
+    Önceden derlenmiş ClinVar deposu (clinvar_store.py) varsa o okunur,
+    yoksa örnek Parquet dosyası zenginleştirilir. mmap_index=True ise
+    eşleştirme indeksi bellek eşlemeli açılır.
+    Dönüş: (clinvar_df, clinvar_index, clingen_index)
+    """
+    if store_dir and os.path.isdir(store_dir):
+        clinvar = load_clinvar_store(store_dir)
+        index_path = os.path.join(store_dir, STORE_INDEX_FILENAME)
+    else:
+        clinvar = enrich_clinvar_df(pd.read_parquet(sample_path))
+        # Bağlantılar tüm tablo için değil, yalnızca eşleşen satırlar için üretilir
+        clinvar = add_gnomad_links(clinvar, genome_build="GRCh38", lazy=True)
+        index_path = "clinvar_index.npz"
+    index = load_or_build_clinvar_index(clinvar, index_path, mmap=mmap_index)
+    clingen_index = build_clingen_index(load_clingen_validity(clingen_path))
+    return clinvar, index, clingen_index
+
+
+def read_variants(source, name=None, regions=None, index=None):
+    """
+    .vcf/.vcf.gz/.csv girişini CHROM/POS/REF/ALT içeren DataFrame olarak okur.
+    `name` dosya uzantısını belirlemek için kullanılır (varsayılan: source).
+    Varyantlar normalize edilir (çok alelli kayıtlar bölünür, kontig adları
+    uyumlanır, ortak bazlar kırpılır). Gerekli sütunlar yoksa ValueError fırlatır.
+    `regions` (CHROM/START/END) verilirse yalnızca bu bölgelerdeki varyantlar
+    döner; bgzip'li VCF ile birlikte .tbi/.csi `index` de verilirse dosyanın
+    yalnızca ilgili blokları açılır.
+    """
+    name = str(name or source)
+    with metrics.timer("parse") as span:
+        df = None
+        if regions is not None and index is not None and name.endswith(".vcf.gz"):
+            try:
+                df = read_vcf_regions(source, index, regions)
+            except (ValueError, *CORRUPT_INPUT_ERRORS) as e:
+                # bgzip'li olmayan dosya ya da bozuk/kesik indeks: tüm dosya taranır
+                logger.warning(f"Indexed region read failed for {name}, scanning whole file: {e}")
+        if df is None:
+            if name.endswith((".vcf.gz", ".vcf")):
+                df = read_vcf(source)
+            else:
+                # Eksik değer içeren kontig sütunu sayı olarak okunursa "1" yerine "1.0" olur
+                df = pd.read_csv(source, dtype={c: str for c in ("CHROM", "REF", "ALT")})
+        span["items"] = len(df)
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Gerekli sütunlar eksik: {', '.join(missing)}")
+    with metrics.timer("normalize", items=len(df)):
+        df = normalize_variants(df)
+    if regions is not None:
+        attrs = dict(df.attrs)
+        df = df[in_regions(df, regions)].reset_index(drop=True)
+        df.attrs = attrs
+    return df
+
+
+def match_variants(df, clinvar_df, clinvar_index, clingen_index):
+    """
+    Varyantları ClinVar ile eşleştirip ClinGen sütunlarını ekler.
+    Dönüş: (merged, matched) — tüm satırlar ve yalnızca ClinVar'da bulunanlar.
+    """
+    with metrics.timer("clinvar_merge", items=len(df)):
+        merged = join_clinvar(df, clinvar_df, clinvar_index)
+        if "gnomAD_Link" not in merged.columns and "gnomad_build" in clinvar_df.attrs:
+            hit = merged["ID"].notna().to_numpy()
+            links = pd.Series(None, index=merged.index, dtype=object)
+            links[hit] = gnomad_links(merged[hit], clinvar_df.attrs["gnomad_build"])
+            merged["gnomAD_Link"] = links
+    with metrics.timer("clingen_lookup", items=len(merged)):
+        merged["ClinGen_Validity"] = lookup_clingen(merged["GENE"], clingen_index, strongest=True)
+        merged["ClinGen_Curations"] = lookup_clingen(merged["GENE"], clingen_index).map(format_clingen_curations)
+    matched = merged[~merged["ID"].isna()].reset_index(drop=True)
+    return merged, matched
@@ -0,0 +1,182 @@
+import io
+import logging
+
+import numpy as np
+import pandas as pd
+
+from bgzf_index import BgzfReader, load_index, query_chunks, is_bgzf
+from variant_normalizer import normalize_contig
+from vcf_reader import read_vcf
+
+logger = logging.getLogger(__name__)
+
+REGION_COLUMNS = ["CHROM", "START", "END"]
+
+
+def parse_bed(source):
+    """
+    BED dosyasını (yol, dosya benzeri nesne ya da metin) 1 tabanlı, kapalı
+    CHROM/START/END bölgelerine çevirir. track/browser/# satırları atlanır.
+    """
+    if isinstance(source, str) and "\n" in source:
+        text = source
+    elif hasattr(source, "read"):
+        source.seek(0)
+        text = source.read()
+    else:
+        with open(source) as f:
+            text = f.read()
+    if isinstance(text, bytes):
+        text = text.decode()
+    lines = [
+        line for line in text.splitlines()
+        if line.strip() and not line.startswith(("#", "track", "browser"))
+    ]
+    df = pd.read_csv(
+        io.StringIO("\n".join(lines)), sep="\t", header=None, usecols=[0, 1, 2],
+        names=REGION_COLUMNS, dtype={"CHROM": str, "START": "int64", "END": "int64"},
+    ) if lines else pd.DataFrame({"CHROM": [], "START": [], "END": []}).astype(
+        {"START": "int64", "END": "int64"})
+    return pd.DataFrame({
+        "CHROM": df["CHROM"].map(normalize_contig),
+        "START": df["START"] + 1,
+        "END": df["END"],
+    }).reset_index(drop=True)
+
+
+def gene_spans(clinvar_df, genes=None):
+    """
+    ClinVar GENE sütunundaki her genin kapsadığı koordinatlar
+    (gen başına CHROM/en küçük POS/en büyük bitiş). `genes` verilirse
+    yalnızca bu genler hesaplanır. Sütunlar: GENE/CHROM/START/END.
+    """
+    gene_col = clinvar_df["GENE"].astype(str).str.upper()
+    keep = clinvar_df["GENE"].notna().to_numpy()
+    if genes is not None:
+        keep = keep & gene_col.isin(genes).to_numpy()
+    rows = clinvar_df.loc[keep, ["CHROM", "POS", "REF"]]
+    rows = pd.DataFrame({
+        "GENE": gene_col[keep].to_numpy(),
+        "CHROM": rows["CHROM"].map(normalize_contig).astype(str).to_numpy(),
+        "START": rows["POS"].to_numpy(dtype=np.int64),
+        "END": rows["POS"].to_numpy(dtype=np.int64) + rows["REF"].astype(str).str.len().to_numpy() - 1,
+    })
+    return rows.groupby(["GENE", "CHROM"], as_index=False).agg(START=("START", "min"), END=("END", "max"))
+
+
+def gene_regions(genes, clinvar_df, padding=0, spans=None):
+    """
+    Gen sembollerini ClinVar GENE sütunundaki varyantların kapsadığı
+    koordinatlara çevirir (gen başına CHROM/en küçük POS/en büyük bitiş).
+    `spans` (gene_spans çıktısı) verilirse ClinVar tablosu taranmaz.
+    Dönüş: (bölgeler, ClinVar'da bulunamayan genler)
+    """
+    wanted = {str(g).strip().upper() for g in genes if str(g).strip()}
+    if not wanted:
+        return pd.DataFrame(columns=REGION_COLUMNS + ["GENE"]), []
+    if spans is None:
+        spans = gene_spans(clinvar_df, genes=wanted)
+    regions = spans[spans["GENE"].isin(wanted).to_numpy()].reset_index(drop=True)
+    regions["START"] = (regions["START"] - padding).clip(lower=1)
+    regions["END"] = regions["END"] + padding
+    missing = sorted(wanted - set(regions["GENE"]))
+    return regions[REGION_COLUMNS + ["GENE"]], missing
+
+
+def merge_regions(regions):
+    """Çakışan ya da bitişik bölgeleri birleştirir; kontig ve START'a göre sıralı döndürür."""
+    if regions is None or len(regions) == 0:
+        return pd.DataFrame({"CHROM": pd.Series(dtype=str), "START": pd.Series(dtype="int64"),
+                             "END": pd.Series(dtype="int64")})
+    df = regions[REGION_COLUMNS].sort_values(["CHROM", "START"]).reset_index(drop=True)
+    chrom = df["CHROM"].to_numpy()
+    start = df["START"].to_numpy(dtype=np.int64)
+    end = df["END"].to_numpy(dtype=np.int64)
+    # Kontig içinde kümülatif en büyük bitiş, bir sonraki bölgenin başlangıcından küçükse yeni grup
+    run_end = pd.Series(end).groupby(chrom).cummax().to_numpy()
+    new_group = np.ones(len(df), dtype=bool)
+    new_group[1:] = (chrom[1:] != chrom[:-1]) | (start[1:] > run_end[:-1] + 1)
+    group = np.cumsum(new_group)
+    merged = df.groupby(group).agg(CHROM=("CHROM", "first"), START=("START", "min"), END=("END", "max"))
+    return merged.reset_index(drop=True)
+
+
+def resolve_panel(clinvar_df, genes=None, bed=None, padding=0, spans=None):
+    """
+    Gen paneli ve/veya BED bölgelerini tek bir birleştirilmiş bölge tablosuna çevirir.
+    `spans`: önceden hesaplanmış gene_spans tablosu (isteğe bağlı).
+    Dönüş: (bölgeler ya da panel yoksa None, bulunamayan genler)
+    """
+    parts, missing = [], []
+    if genes:
+        found, missing = gene_regions(genes, clinvar_df, padding=padding, spans=spans)
+        parts.append(found)
+    if bed is not None:
+        parts.append(parse_bed(bed))
+    if not parts:
+        return None, missing
+    return merge_regions(pd.concat(parts, ignore_index=True)), missing
+
+
+def in_regions(df, regions):
+    """Her varyantın (CHROM, POS) bölgelerden birinin içinde olup olmadığı."""
+    regions = merge_regions(regions)
+    mask = np.zeros(len(df), dtype=bool)
+    chrom = df["CHROM"].map(normalize_contig).astype(str).to_numpy()
+    pos = df["POS"].to_numpy(dtype=np.int64)
+    for contig, reg in regions.groupby("CHROM"):
+        rows = np.flatnonzero(chrom == contig)
+        if not len(rows):
+            continue
+        starts = reg["START"].to_numpy()
+        ends = reg["END"].to_numpy()
+        # Birleştirilmiş bölgeler çakışmadığından POS'tan önceki son bölgeye bakmak yeterli
+        i = np.searchsorted(starts, pos[rows], side="right") - 1
+        ok = i >= 0
+        ok[ok] = pos[rows][ok] <= ends[i[ok]]
+        mask[rows] = ok
+    return mask
+
+
+def read_vcf_regions(source, index, regions, columns=None):
+    """
+    bgzip'li VCF'ten yalnızca bölgelere denk gelen BGZF bloklarını açarak okur.
+    `index`: .tbi/.csi yolu, dosya benzeri nesne ya da load_index çıktısı.
+    Dönüş: read_vcf ile aynı biçimde, yalnızca bölge içindeki varyantlar.
+    """
+    if not isinstance(index, dict):
+        index = load_index(index)
+    tid_of = {normalize_contig(name): tid for tid, name in enumerate(index["names"])}
+
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        raw = open(source, "rb")
+        to_close = [raw]
+    else:
+        raw, to_close = source, []
+    try:
+        raw.seek(0)
+        if not is_bgzf(raw):
+            raise ValueError("Bölge sorgusu için VCF bgzip ile sıkıştırılmış olmalı")
+        reader = BgzfReader(raw)
+        chunks = []
+        for contig, start, end in merge_regions(regions).itertuples(index=False):
+            tid = tid_of.get(contig)
+            if tid is not None:
+                chunks.extend(query_chunks(index, tid, start - 1, end))
+        chunks.sort()
+        data = []
+        last_end = -1
+        for beg, end in chunks:
+            beg = max(beg, last_end)
+            if beg < end:
+                data.append(reader.read_range(beg, end))
+                last_end = end
+    finally:
+        for handle in to_close:
+            handle.close()
+
+    df = read_vcf(io.BytesIO(b"".join(data)), columns=columns)
+    df = df[in_regions(df, regions)].reset_index(drop=True)
+    logger.info(f"Region query read {reader.blocks_read} BGZF blocks for {len(df)} variants")
+    df.attrs["parse_stats"] = {**df.attrs.get("parse_stats", {}), "blocks_read": reader.blocks_read}
+    return df
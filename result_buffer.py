@@ -0,0 +1,118 @@
+import io
+import logging
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Sonuçlar bu kadar satır birikince Arrow tablosuna çevrilir
+DEFAULT_FLUSH_ROWS = 256
+
+_POS = "_pos"
+
+
+def _column(values):
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Aynı sütunda karışık tipler (ör. sayı ve hata metni) metin olarak saklanır
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def _conflicting_columns(tables):
+    """Parçalar arasında sayısal olarak birleştirilemeyen tiplere sahip sütunlar."""
+    types = {}
+    for table in tables:
+        for field in table.schema:
+            if not pa.types.is_null(field.type):
+                types.setdefault(field.name, set()).add(field.type)
+    return {
+        name for name, found in types.items()
+        if len(found) > 1 and not all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in found)
+    }
+
+
+def _to_strings(table, names):
+    for name in names:
+        i = table.schema.get_field_index(name)
+        if i >= 0 and not pa.types.is_string(table.schema.field(i).type):
+            table = table.set_column(i, name, pc.cast(table.column(i), pa.string()))
+    return table
+
+
+class ResultBuffer:
+    """
+    Anotasyon sonuçlarını satır sözlükleri listesi yerine sütunlu (Arrow)
+    parçalarda biriktirir. Sonuçlar geldiği sırada eklenir; tablo her zaman
+    giriş konumuna göre sıralı okunur. Bellek, satır başına Python
+    nesneleri yerine sıkıştırılmış sütunlar kadar yer tutar.
+    """
+
+    def __init__(self, flush_rows=DEFAULT_FLUSH_ROWS):
+        self.flush_rows = flush_rows
+        self._pending = []
+        self._tables = []
+        self._rows = 0
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, pos, result):
+        self._pending.append((pos, result))
+        self._rows += 1
+        if len(self._pending) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        columns = {_POS: [pos for pos, _ in self._pending]}
+        for _, result in self._pending:
+            for key in result:
+                columns.setdefault(key, None)
+        for key in columns:
+            if key != _POS:
+                columns[key] = [result.get(key) for _, result in self._pending]
+        self._tables.append(pa.table({k: _column(v) for k, v in columns.items()}))
+        self._pending.clear()
+
+    def to_table(self):
+        """Tüm sonuçlar, giriş sırasına göre tek bir Arrow tablosu olarak."""
+        self.flush()
+        if not self._tables:
+            return pa.table({})
+        if len(self._tables) > 1:
+            try:
+                table = pa.concat_tables(self._tables, promote_options="permissive")
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                names = _conflicting_columns(self._tables)
+                table = pa.concat_tables(
+                    [_to_strings(t, names) for t in self._tables], promote_options="permissive"
+                )
+            # Parçalar birleştirilip saklanır; sonraki okumalar yeniden birleştirmez
+            self._tables = [table]
+        table = self._tables[0]
+        return table.sort_by(_POS).drop_columns([_POS])
+
+    def to_pandas(self):
+        return self.to_table().to_pandas()
+
+    def page(self, start, size, columns=None):
+        """`start` konumundan itibaren `size` satırlık sayfa (DataFrame)."""
+        table = self.to_table()
+        if columns:
+            table = table.select([c for c in columns if c in table.column_names])
+        return table.slice(start, size).to_pandas()
+
+    def to_parquet_bytes(self):
+        out = io.BytesIO()
+        pq.write_table(self.to_table(), out, compression="zstd")
+        return out.getvalue()
+
+    def to_csv_bytes(self):
+        out = io.BytesIO()
+        pacsv.write_csv(self.to_table(), out)
+        return out.getvalue()
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+from clinvar_parser import get_gnomad_cache
+from gemini_handler import get_gemini_cache
+from pubmed_handler import get_pubmed_cache
+from reference_data import load_reference_data, CLINVAR_STORE_DIR, CLINVAR_SAMPLE_PATH, CLINGEN_PATH
+from regions import gene_spans
+
+logger = logging.getLogger(__name__)
+
+
+class SharedResources:
+    """
+    Süreç başına bir kez yüklenen ve tüm oturumların paylaştığı salt okunur
+    referans veriler (ClinVar tablosu ve indeksi, ClinGen indeksi, gen
+    koordinatları) ile harici API önbellekleri.
+
+    Nesneler oturumlara kopyalanmadan verilir; eşleştirme indeksi bellek
+    eşlemeli açıldığından aynı depoyu kullanan süreçler de sayfa önbelleğini
+    paylaşır. Paylaşılan tablolar yerinde değiştirilmemelidir (pandas
+    copy-on-write türetilen tabloların ayrı kopya almasını sağlar).
+    """
+
+    def __init__(self, clinvar_df, clinvar_index, clingen_index, gene_spans, caches, load_seconds):
+        self.clinvar_df = clinvar_df
+        self.clinvar_index = clinvar_index
+        self.clingen_index = clingen_index
+        self.gene_spans = gene_spans
+        self.caches = caches
+        self.load_seconds = load_seconds
+
+    @property
+    def reference(self):
+        """load_reference_data ile aynı biçimde (clinvar_df, clinvar_index, clingen_index)."""
+        return self.clinvar_df, self.clinvar_index, self.clingen_index
+
+    def cache_counts(self):
+        """Harici API önbelleklerinin (süreç içi) isabet/ıska sayaçları."""
+        return {name: (cache.hits, cache.misses) for name, cache in self.caches.items()}
+
+
+def load_shared_resources(store_dir=CLINVAR_STORE_DIR, sample_path=CLINVAR_SAMPLE_PATH,
+                          clingen_path=CLINGEN_PATH):
+    start = time.perf_counter()
+    clinvar_df, clinvar_index, clingen_index = load_reference_data(
+        store_dir, sample_path, clingen_path, mmap_index=True
+    )
+    for name in ("keys", "rows"):
+        clinvar_index[name].flags.writeable = False
+    # Önbellek bağlantıları da burada açılır; ilk sorgu bağlantı kurma maliyetini ödemez
+    caches = {"PubMed": get_pubmed_cache(), "gnomAD": get_gnomad_cache(), "Gemini": get_gemini_cache()}
+    resources = SharedResources(
+        clinvar_df, clinvar_index, clingen_index, gene_spans(clinvar_df), caches,
+        load_seconds=time.perf_counter() - start,
+    )
+    logger.info(f"Loaded shared reference data ({len(clinvar_df)} ClinVar rows) "
+                f"in {resources.load_seconds:.2f}s")
+    return resources
+
+
+_resources = {}
+_resources_lock = threading.Lock()
+
+
+def get_shared_resources(store_dir=CLINVAR_STORE_DIR, sample_path=CLINVAR_SAMPLE_PATH,
+                         clingen_path=CLINGEN_PATH):
+    """
+    Süreç içinde yol üçlüsü başına tek bir SharedResources örneği döndürür.
+    Aynı anda gelen ilk oturumlar yüklemeyi bekler; veriler bir kez yüklenir.
+    """
+    key = (store_dir, sample_path, clingen_path)
+    with _resources_lock:
+        resources = _resources.get(key)
+        if resources is None:
+            resources = load_shared_resources(store_dir, sample_path, clingen_path)
+            _resources[key] = resources
+        return resources
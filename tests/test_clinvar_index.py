@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clinvar_index import (
+    KEY_COLUMNS, build_clinvar_index, join_clinvar, load_or_build_clinvar_index,
+)
+from variant_normalizer import normalize_key_columns, normalize_variants
+from variant_table import compact_variants, is_packed, variant_keys
+
+
+def _clinvar():
+    return pd.DataFrame({
+        "CHROM": ["1", "1", "1", "2", "X", "MT", "3", "3"],
+        "POS": [100, 100, 200, 300, 400, 500, 600, 600],
+        "REF": ["A", "A", "CTT", "G", "T", "A", "C", "C"],
+        "ALT": ["G", "G", "C", "GA", "C", "<DEL>", "T", "A"],
+        "ID": [1, 2, 3, 4, 5, 6, 7, 8],
+        "CLNSIG": ["Pathogenic", "Benign", "Likely pathogenic", "Benign",
+                   "Uncertain significance", "Pathogenic", "Benign", "Pathogenic"],
+    })
+
+
+def _variants():
+    return pd.DataFrame({
+        # chr öneki, kırpılmamış indel, çok alelli kayıt ve eşleşmeyen satırlar
+        "CHROM": ["chr1", "1", "chr2", "3", "chrX", "chrM", "7", "1"],
+        "POS": [100, 200, 300, 600, 400, 500, 700, 100],
+        "REF": ["A", "CTTG", "G", "C", "T", "A", "G", "A"],
+        "ALT": ["G", "CG", "GA", "T,A", "G", "<DEL>", "C", "T"],
+        "SAMPLE": list("abcdefgh"),
+    })
+
+
+def _expected(variants, clinvar):
+    """Referans: normalize edilmiş anahtarlar üzerinde düz pd.merge."""
+    clinvar = clinvar.assign(**normalize_key_columns(clinvar))
+    return pd.merge(variants, clinvar, on=KEY_COLUMNS, how="left")
+
+
+def _as_records(df):
+    return df.astype(object).where(df.notna(), None).astype(str).to_dict("records")
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_join_matches_merge(compact):
+    clinvar = _clinvar()
+    variants = normalize_variants(_variants(), compact=False)
+    if compact:
+        variants = compact_variants(variants)
+    result = join_clinvar(variants, clinvar, build_clinvar_index(clinvar))
+    expected = _expected(normalize_variants(_variants(), compact=False), clinvar)
+    assert list(result.columns) == list(expected.columns)
+    assert _as_records(result) == _as_records(expected)
+    assert result["ID"].notna().sum() == 7
+    # Bir varyanta birden çok ClinVar kaydı düşerse hepsi döner
+    assert sorted(result.loc[result["POS"] == 100, "ID"].dropna().astype(int)) == [1, 2]
+
+
+def test_join_normalizes_unnormalized_input():
+    clinvar = _clinvar()
+    variants = _variants().assign(ALT=lambda d: d["ALT"].str.split(",").str[0])
+    result = join_clinvar(variants, clinvar, build_clinvar_index(clinvar))
+    assert result["ID"].notna().sum() == 6
+
+
+def test_join_keeps_column_dtypes():
+    clinvar = _clinvar().assign(CLNSIG=lambda d: d["CLNSIG"].astype("category"))
+    variants = normalize_variants(_variants())
+    result = join_clinvar(variants, clinvar, build_clinvar_index(clinvar))
+    assert isinstance(result["CLNSIG"].dtype, pd.CategoricalDtype)
+
+
+def test_random_join_matches_merge():
+    rng = np.random.default_rng(0)
+    n = 2000
+    clinvar = pd.DataFrame({
+        "CHROM": rng.choice(["1", "2", "X", "GL000220.1"], n),
+        "POS": rng.integers(1, 5000, n),
+        "REF": rng.choice(["A", "C", "G", "T", "AC", "GTT"], n),
+        "ALT": rng.choice(["A", "C", "G", "T", "ACG"], n),
+        "ID": np.arange(n),
+    })
+    clinvar = clinvar[clinvar["REF"] != clinvar["ALT"]].reset_index(drop=True)
+    variants = normalize_variants(pd.concat([clinvar.sample(300, random_state=1),
+                                             clinvar.sample(100, random_state=2).assign(POS=lambda d: d["POS"] + 1)])
+                                  [KEY_COLUMNS].reset_index(drop=True), compact=False)
+    result = join_clinvar(compact_variants(variants), clinvar, build_clinvar_index(clinvar))
+    assert _as_records(result) == _as_records(_expected(variants, clinvar))
+
+
+def test_snv_keys_are_packed_and_unique():
+    df = pd.DataFrame({
+        "CHROM": ["1", "1", "1", "X", "GL000220.1", "1"],
+        "POS": [100, 100, 101, 100, 100, 100],
+        "REF": ["A", "A", "A", "A", "A", "AT"],
+        "ALT": ["G", "T", "G", "G", "G", "A"],
+    })
+    keys = variant_keys(df)
+    assert is_packed(keys).tolist() == [True, True, True, True, False, False]
+    assert len(set(keys.tolist())) == len(df)
+    assert (variant_keys(compact_variants(df)) == keys).all()
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    clinvar = _clinvar()
+    path = str(tmp_path / "index.npz")
+    load_or_build_clinvar_index(clinvar, path)
+    shuffled = clinvar.sample(frac=1, random_state=3).reset_index(drop=True)
+    for mmap in (False, True):
+        index = load_or_build_clinvar_index(shuffled, path, mmap=mmap)
+        result = join_clinvar(normalize_variants(_variants()), shuffled, index)
+        expected = _expected(normalize_variants(_variants(), compact=False), shuffled)
+        assert _as_records(result) == _as_records(expected)
+
+
+def test_mismatched_index_drops_matches():
+    clinvar = _clinvar()
+    index = build_clinvar_index(clinvar)
+    other = clinvar.assign(POS=clinvar["POS"] + 1)
+    result = join_clinvar(normalize_variants(_variants()), other, index)
+    assert result.loc[result["REF"].astype(str).str.len() == 1, "ID"].isna().all()
+
+
+def test_shifted_clinvar_snv_matches():
+    # ClinVar'da kırpılmamış yazılan SNV: 1 100 AC>AT, normalize hali 1 101 C>T
+    clinvar = pd.DataFrame({"CHROM": ["1", "1"], "POS": [100, 200], "REF": ["AC", "G"],
+                            "ALT": ["AT", "A"], "ID": [1, 2]})
+    variants = normalize_variants(pd.DataFrame({
+        "CHROM": ["1", "1", "1"], "POS": [101, 100, 200], "REF": ["C", "AC", "G"], "ALT": ["T", "AT", "A"],
+    }))
+    result = join_clinvar(variants, clinvar, build_clinvar_index(clinvar))
+    assert result["ID"].tolist() == [1, 1, 2]
+    assert _as_records(result) == _as_records(_expected(normalize_variants(variants, compact=False), clinvar))
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from clinvar_index import build_clinvar_index, join_clinvar
+from reference_data import read_variants
+from variant_normalizer import normalize_key_columns
+
+
+def test_missing_keys_stay_missing():
+    df = pd.DataFrame({
+        "CHROM": ["1", "1", None, "2"],
+        "POS": [100, 200, 300, 400],
+        "REF": ["A", "AT", "G", None],
+        "ALT": [None, "A", "C", "T"],
+    })
+    out = normalize_key_columns(df)
+    # Eksik alelli satır başka bir satırın alellerini ya da POS kaymasını almaz
+    assert out.loc[0, "POS"] == 100 and out.loc[0, "REF"] == "A" and pd.isna(out.loc[0, "ALT"])
+    assert out.loc[1].tolist() == ["1", 200, "AT", "A"]
+    assert pd.isna(out.loc[2, "CHROM"]) and out.loc[2, "POS"] == 300
+    assert pd.isna(out.loc[3, "REF"]) and out.loc[3, "ALT"] == "T"
+
+
+def test_missing_keys_never_match(tmp_path):
+    path = tmp_path / "variants.csv"
+    path.write_text("CHROM,POS,REF,ALT\n1,100,A,\n1,200,AT,A\n,300,G,C\n")
+    variants = read_variants(str(path))
+    assert variants["CHROM"].astype(str).tolist()[:2] == ["1", "1"]
+    assert pd.isna(variants.loc[0, "ALT"]) and variants.loc[0, "REF"] == "A"
+
+    clinvar = pd.DataFrame({
+        "CHROM": ["1", "1", "1"], "POS": [100, 200, 300], "REF": ["AT", "AT", "G"],
+        "ALT": ["A", "A", "C"], "ID": [1, 2, 3],
+    })
+    result = join_clinvar(variants, clinvar, build_clinvar_index(clinvar))
+    # Eksik ALT'lı satır 1:200 AT>A kaydıyla eşleşmez
+    assert pd.isna(result.loc[0, "ID"])
+    assert result.loc[1, "ID"] == 2
+    assert result["ID"].isna().sum() == 2
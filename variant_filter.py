@@ -0,0 +1,121 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from annotation_plan import KEY_COLUMNS
+from clinvar_parser import cached_gnomad_batch
+
+logger = logging.getLogger(__name__)
+
+# ClinVar CLNREVSTAT -> yıldız seviyesi (ClinVar "review status" tablosu)
+REVIEW_STARS = {
+    "practice guideline": 4,
+    "reviewed by expert panel": 3,
+    "criteria provided, multiple submitters, no conflicts": 2,
+    "criteria provided, multiple submitters": 2,
+    "criteria provided, conflicting classifications": 1,
+    "criteria provided, conflicting interpretations": 1,
+    "criteria provided, single submitter": 1,
+    "no assertion criteria provided": 0,
+    "no assertion provided": 0,
+    "no classification provided": 0,
+    "no classification for the individual variant": 0,
+    "no interpretation for the single variant": 0,
+}
+
+# Varsayılan olarak dış servislere gönderilmeyen ClinVar sınıfları
+BENIGN_CLNSIG = ["Benign", "Likely benign", "Benign/Likely benign"]
+
+# Elenen satırlar çıktıda bu sütunda eleme nedeniyle işaretlenir
+FILTER_COLUMN = "Filtre"
+
+
+def _normalize_label(series):
+    return series.astype(str).str.replace("_", " ", regex=False).str.strip().str.lower()
+
+
+def review_stars(clnrevstat):
+    """CLNREVSTAT sütununu 0-4 yıldız seviyesine çevirir (bilinmeyenler 0)."""
+    labels = _normalize_label(pd.Series(clnrevstat))
+    return labels.map(REVIEW_STARS).fillna(0).astype("int8")
+
+
+def _unique(df, columns):
+    """Verilen sütunlardaki tekil değer demetleri."""
+    return set(df[columns].astype(str).itertuples(index=False, name=None))
+
+
+def cached_allele_frequencies(df, genome_build="GRCh38", cache=None):
+    """Önbellekteki gnomAD PopMax AF değerleri; önbellekte olmayanlar NaN."""
+    variants = list(zip(df["CHROM"], df["POS"], df["REF"], df["ALT"]))
+    stats = cached_gnomad_batch(variants, genome_build, cache=cache)
+    return pd.Series(
+        [s.get("PopMax_AF") if isinstance(s, dict) else None for s in stats],
+        index=df.index, dtype="float64",
+    )
+
+
+def filter_variants(df, exclude_clnsig=BENIGN_CLNSIG, min_stars=0, clingen_classes=None,
+                    max_af=None, genome_build="GRCh38", cache=None, use_llm=True):
+    """
+    Dış servis çağrılarından önce bilgi vermeyen varyantları eler.
+    - exclude_clnsig: bu CLNSIG sınıflarındaki varyantlar elenir
+    - min_stars: CLNREVSTAT yıldız seviyesi bunun altındakiler elenir
+    - clingen_classes: verilirse yalnızca bu ClinGen sınıflarındaki genler kalır
+    - max_af: önbellekteki gnomAD PopMax AF bu değerin üstündeyse elenir
+      (frekans için ağa çıkılmaz; önbellekte olmayan varyantlar kalır)
+    Dönüş: (kalan satırlar, rapor). Rapor; kriter başına elenen satır sayısını,
+    servis başına atlanan sorgu sayısını ve elenen satırları ("filtered",
+    FILTER_COLUMN sütununda eleme nedeniyle) içerir. Elenen satırlar yalnızca
+    dış servislere gönderilmez; sonuç tablosunda anotasyonsuz olarak yer alır.
+    """
+    keep = np.ones(len(df), dtype=bool)
+    reason = np.full(len(df), None, dtype=object)
+    removed_by = {}
+
+    def apply(name, mask):
+        nonlocal keep
+        mask = np.asarray(mask, dtype=bool)
+        dropped = keep & ~mask
+        removed_by[name] = int(dropped.sum())
+        reason[dropped] = name
+        keep &= mask
+
+    if exclude_clnsig and "CLNSIG" in df.columns:
+        excluded = set(_normalize_label(pd.Series(list(exclude_clnsig))))
+        apply("clnsig", ~_normalize_label(df["CLNSIG"]).isin(excluded).to_numpy())
+    if min_stars and "CLNREVSTAT" in df.columns:
+        apply("stars", (review_stars(df["CLNREVSTAT"]) >= min_stars).to_numpy())
+    if clingen_classes and "ClinGen_Validity" in df.columns:
+        apply("clingen", df["ClinGen_Validity"].isin(list(clingen_classes)).to_numpy())
+    if max_af is not None and keep.any():
+        af = pd.Series(np.nan, index=df.index)
+        af[keep] = cached_allele_frequencies(df[keep], genome_build, cache=cache)
+        apply("allele_frequency", ~(af > max_af).to_numpy())
+
+    kept = df[keep].reset_index(drop=True)
+    removed = len(df) - len(kept)
+    # Dış çağrılar tekilleştirilir (bkz. annotation_plan): yalnızca kalan satırlarda
+    # karşılığı olmayan tekil ID/varyant/birimler atlanmış sayılır
+    unit_columns = KEY_COLUMNS + (["ID"] if "ID" in df.columns else [])
+    saved = {
+        "pubmed": removed,
+        "gnomad": len(_unique(df[~keep], KEY_COLUMNS) - _unique(kept, KEY_COLUMNS)),
+        "gemini": len(_unique(df[~keep], unit_columns) - _unique(kept, unit_columns)),
+    }
+    if "ID" in df.columns:
+        # PubMed sorguları Variation ID başınadır
+        saved["pubmed"] = len(set(df.loc[~keep, "ID"].dropna()) - set(kept["ID"].dropna()))
+    if not use_llm:
+        saved["gemini"] = 0
+    report = {
+        "input": len(df),
+        "kept": len(kept),
+        "removed": removed,
+        "removed_by": removed_by,
+        "saved_calls": saved,
+        "filtered": df[~keep].assign(**{FILTER_COLUMN: reason[~keep]}).reset_index(drop=True),
+    }
+    logger.info(f"Pre-annotation filter kept {len(kept)}/{len(df)} variants; removed by {removed_by}")
+    return kept, report
@@ -0,0 +1,110 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from variant_table import compact_variants, COMPACT_MIN_ROWS
+from vcf_reader import split_multiallelic
+
+logger = logging.getLogger(__name__)
+
+# Kontig adlarının ortak biçimi: "chr" öneki yok, cinsiyet/mitokondri kontigleri büyük harf
+CONTIG_ALIASES = {"X": "X", "Y": "Y", "M": "MT", "MT": "MT"}
+
+# Kırpılmayan (sembolik / eksik) ALT değerleri
+_SKIP_ALT_PREFIXES = ("<", "*", ".")
+
+
+def normalize_contig(value):
+    """'chr1' -> '1', 'chrM' / 'M' -> 'MT', 'chrx' -> 'X'."""
+    contig = str(value).strip()
+    if contig[:3].lower() == "chr":
+        contig = contig[3:]
+    return CONTIG_ALIASES.get(contig.upper(), contig)
+
+
+@lru_cache(maxsize=1_000_000)
+def trim_alleles(ref, alt):
+    """
+    REF/ALT çiftindeki ortak son ve ön bazları kırpar (her alelde en az bir baz
+    kalır). Önce sondan kırpmak, referans dizisi olmadan yapılabilen sola
+    hizalamadır. Dönüş: (POS kayması, REF, ALT).
+    """
+    if not ref or not alt or alt.startswith(_SKIP_ALT_PREFIXES) or ref == alt:
+        return 0, ref, alt
+    end = 0
+    while end < min(len(ref), len(alt)) - 1 and ref[-1 - end] == alt[-1 - end]:
+        end += 1
+    if end:
+        ref, alt = ref[:-end], alt[:-end]
+    start = 0
+    while start < min(len(ref), len(alt)) - 1 and ref[start] == alt[start]:
+        start += 1
+    return start, ref[start:], alt[start:]
+
+
+def _expand(values, codes, dtype):
+    # Benzersiz değerlerden satırlara yayma; dizeler tekrar tekrar kutulanmaz
+    # factorize eksik değerlere -1 kodu verir; bunlar başka satırın değerini değil NA alır
+    return pd.array(values, dtype=dtype).take(codes, allow_fill=True)
+
+
+def _map_unique(series, fn):
+    """`fn`'i yalnızca benzersiz değerlere uygular, sonucu satırlara yayar."""
+    series = series.astype(str)
+    codes, uniques = pd.factorize(series, sort=False)
+    return _expand([fn(u) for u in uniques], codes, series.dtype)
+
+
+def normalize_key_columns(df):
+    """
+    CHROM/POS/REF/ALT sütunlarını eşleştirme anahtarı biçimine getirir; satır
+    sayısı değişmez. Kontig adı uyumlanır, REF/ALT büyük harfe çevrilir,
+    ortak ön/son bazlar kırpılıp POS buna göre kaydırılır.
+    Hesaplama benzersiz kontig ve REF/ALT çiftleri üzerinden yapılır.
+    """
+    pos = pd.to_numeric(df["POS"], errors="coerce").fillna(-1).astype("int64").to_numpy()
+    ref = df["REF"].astype(str).str.strip().str.upper()
+    alt = df["ALT"].astype(str).str.strip().str.upper()
+
+    codes, uniques = pd.factorize(ref + "\t" + alt, sort=False)
+    trimmed = [trim_alleles(*pair.split("\t", 1)) for pair in uniques]
+    # REF ya da ALT'ı eksik satırlar (kod -1) kırpılmaz, kaydırılmaz; eksik alel NA kalır
+    shift = np.array([t[0] for t in trimmed] + [0], dtype=np.int64)
+    missing = codes < 0
+    out_ref = _expand([t[1] for t in trimmed], codes, ref.dtype)
+    out_alt = _expand([t[2] for t in trimmed], codes, alt.dtype)
+    if missing.any():
+        out_ref[missing] = ref.array[missing]
+        out_alt[missing] = alt.array[missing]
+
+    return pd.DataFrame({
+        "CHROM": _map_unique(df["CHROM"], normalize_contig),
+        "POS": pos + np.where(pos >= 0, shift[codes], 0),
+        "REF": out_ref,
+        "ALT": out_alt,
+    })
+
+
+def normalize_variants(df, split_alleles=True, compact=True):
+    """
+    Yüklenen varyant tablosunu normalize eder: çok alelli kayıtlar ayrı
+    satırlara bölünür, ardından CHROM/POS/REF/ALT `normalize_key_columns`
+    ile değiştirilir. compact=True ise COMPACT_MIN_ROWS ve üzeri satırlı
+    tablolarda anahtar sütunları küçük tiplere çevrilir (bkz. compact_variants). Diğer sütunlar ve `df.attrs` korunur;
+    `df.attrs["normalized"]` eşleştirmede yeniden normalize etmeyi önler.
+    """
+    attrs = dict(df.attrs)
+    out = df
+    if split_alleles:
+        out = split_multiallelic(out.assign(ALT=out["ALT"].astype(str)))
+    keys = normalize_key_columns(out)
+    keys.index = out.index
+    out = out.assign(**{c: keys[c] for c in keys.columns})
+    if len(out) != len(df):
+        logger.info(f"Split multi-allelic records: {len(df)} -> {len(out)} rows")
+    if compact and len(out) >= COMPACT_MIN_ROWS:
+        out = compact_variants(out)
+    out.attrs = {**attrs, "normalized": True}
+    return out
@@ -0,0 +1,112 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ["CHROM", "POS", "REF", "ALT"]
+
+# Normalize kontig adı -> sabit kod (paketlenmiş anahtarlarda ve categorical sıralamasında kullanılır)
+CONTIG_CODES = {**{str(i): i for i in range(1, 23)}, "X": 23, "Y": 24, "MT": 25}
+_BASE_CODES = {"A": 0, "C": 1, "G": 2, "T": 3}
+
+# Anahtarın en üst biti: 0 = paketlenmiş SNV (kesin), 1 = hash (doğrulanmalı)
+HASHED_KEY_FLAG = np.uint64(1 << 63)
+_POS_LIMIT = 1 << 32
+# Bundan küçük tablolarda categorical dönüşümünün maliyeti bellek kazancından büyüktür
+COMPACT_MIN_ROWS = 10_000
+
+
+def _unique_map(series, fn, dtype):
+    """`fn`'i yalnızca benzersiz değerlere uygular; eksik değerler fn(None) alır."""
+    codes, uniques = pd.factorize(series, sort=False)
+    values = np.array([fn(u) for u in uniques] + [fn(None)], dtype=dtype)
+    return values[codes]
+
+
+def contig_codes(chrom):
+    """Normalize kontig adlarının kodları (CONTIG_CODES dışındakiler 0)."""
+    return _unique_map(chrom, lambda c: CONTIG_CODES.get(str(c), 0) if c is not None else 0, np.int64)
+
+
+def _base_codes(alleles):
+    return _unique_map(alleles, lambda a: _BASE_CODES.get(a, -1) if isinstance(a, str) else -1, np.int64)
+
+
+def snv_keys(df):
+    """
+    Tek bazlı (A/C/G/T) varyantlar için kesin, paketlenmiş 64-bit anahtarlar:
+    kontig kodu << 36 | POS << 4 | REF << 2 | ALT.
+    Dönüş: (anahtarlar, paketlenebilen satır maskesi); maske dışındaki anahtarlar 0.
+    """
+    pos = df["POS"].to_numpy(dtype=np.int64)
+    chrom = contig_codes(df["CHROM"])
+    ref = _base_codes(df["REF"])
+    alt = _base_codes(df["ALT"])
+    packed = (chrom > 0) & (ref >= 0) & (alt >= 0) & (pos >= 0) & (pos < _POS_LIMIT)
+    keys = np.zeros(len(df), dtype=np.uint64)
+    keys[packed] = (
+        (chrom[packed].astype(np.uint64) << np.uint64(36))
+        | (pos[packed].astype(np.uint64) << np.uint64(4))
+        | (ref[packed].astype(np.uint64) << np.uint64(2))
+        | alt[packed].astype(np.uint64)
+    )
+    return keys, packed
+
+
+def variant_keys(df):
+    """
+    Normalize CHROM/POS/REF/ALT sütunları için 64-bit anahtarlar. SNV'ler
+    paketlenir (çakışmasız, doğrulama gerekmez); diğerleri (indel, sembolik
+    alel, standart dışı kontig) üst biti 1 olan hash anahtarı alır.
+    Sütun tipleri (categorical/str, uint32/int64) anahtarı değiştirmez.
+    """
+    keys, packed = snv_keys(df)
+    if not packed.all():
+        other = df.loc[~packed, KEY_COLUMNS]
+        hashed = pd.util.hash_pandas_object(pd.DataFrame({
+            "CHROM": other["CHROM"].astype(str),
+            "POS": other["POS"].to_numpy(dtype=np.int64),
+            "REF": other["REF"].astype(str),
+            "ALT": other["ALT"].astype(str),
+        }), index=False).to_numpy(dtype=np.uint64)
+        keys[~packed] = hashed | HASHED_KEY_FLAG
+    return keys
+
+
+def is_packed(keys):
+    return (keys & HASHED_KEY_FLAG) == 0
+
+
+def _categorical(series, leading=()):
+    """Categorical'e çevirir; `leading` içindeki değerler (varsa) kategorilerin başına alınır."""
+    cat = pd.Categorical(series)
+    if leading:
+        present = set(cat.categories)
+        first = [c for c in leading if c in present]
+        rest = [c for c in cat.categories if c not in set(first)]
+        cat = cat.reorder_categories(first + rest)
+    return cat
+
+
+def compact_variants(df):
+    """
+    Normalize edilmiş varyant tablosunu küçük tiplere çevirir: CHROM
+    categorical (kromozom sırasıyla), POS uint32 (sığıyorsa), REF/ALT
+    categorical. Diğer sütunlar ve `df.attrs` korunur.
+    """
+    if df.empty:
+        return df
+    attrs = dict(df.attrs)
+    pos = df["POS"]
+    if pos.notna().all() and pos.min() >= 0 and pos.max() < _POS_LIMIT:
+        pos = pos.astype(np.uint32)
+    out = df.assign(
+        CHROM=_categorical(df["CHROM"], leading=CONTIG_CODES),
+        POS=pos,
+        REF=_categorical(df["REF"]),
+        ALT=_categorical(df["ALT"]),
+    )
+    out.attrs = attrs
+    return out
@@ -0,0 +1,135 @@
+import csv
+import gzip
+import logging
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# VCF'in sabit ilk 8 sütunu (FORMAT ve örnek sütunları okunmaz)
+VCF_COLUMNS = ["CHROM", "POS", "ID", "REF", "ALT", "QUAL", "FILTER", "INFO"]
+DEFAULT_COLUMNS = ["CHROM", "POS", "REF", "ALT"]
+DEFAULT_CHUNKSIZE = 200_000
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _open_binary(source):
+    """
+    Dosya yolu ya da dosya benzeri nesneyi (ör. Streamlit UploadedFile)
+    ikili akış olarak açar; gzip ise akışı sıkıştırmayı açarak sarar.
+    Dönüş: (akış, kapatılacak_nesneler)
+    """
+    to_close = []
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        raw = open(source, "rb")
+        to_close.append(raw)
+    else:
+        raw = source
+        raw.seek(0)
+
+    magic = raw.read(2)
+    raw.seek(0)
+    if magic == _GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        to_close.insert(0, stream)
+        return stream, to_close
+    return raw, to_close
+
+
+def _skip_header(stream):
+    """
+    '#' ile başlayan başlık satırlarını atlar, akışı ilk veri satırına konumlar.
+    Veri satırı yoksa False döner.
+    """
+    while True:
+        pos = stream.tell()
+        line = stream.readline()
+        if not line:
+            return False
+        if not line.startswith(b"#"):
+            stream.seek(pos)
+            return True
+
+
+def split_multiallelic(df):
+    """Virgülle ayrılmış ALT değerlerini (ör. 'A,T') ayrı satırlara böler."""
+    if "ALT" not in df.columns or df.empty:
+        return df
+    if not df["ALT"].str.contains(",", regex=False).any():
+        return df
+    return df.assign(ALT=df["ALT"].str.split(",")).explode("ALT", ignore_index=True)
+
+
+def iter_vcf_chunks(source, columns=None, chunksize=DEFAULT_CHUNKSIZE,
+                    split_alleles=True, stats=None):
+    """
+    VCF/VCF.gz dosyasını sabit boyutlu parçalar halinde akış olarak okur.
+    Her parça yalnızca istenen sütunları içeren bir DataFrame'dir; bellek
+    kullanımı dosya boyutundan bağımsız olarak parça boyutuyla sınırlı kalır.
+    `stats` sözlüğü verilirse kayıt sayısı ve süre bilgileriyle doldurulur.
+    """
+    columns = list(columns or DEFAULT_COLUMNS)
+    unknown = set(columns) - set(VCF_COLUMNS)
+    if unknown:
+        raise ValueError(f"Bilinmeyen VCF sütunları: {sorted(unknown)}")
+
+    usecols = sorted(VCF_COLUMNS.index(c) for c in columns)
+    names = [VCF_COLUMNS[i] for i in usecols]
+    dtype = {i: ("int64" if VCF_COLUMNS[i] == "POS" else str) for i in usecols}
+
+    if stats is None:
+        stats = {}
+    stats.update({"records": 0, "rows": 0, "chunks": 0, "seconds": 0.0})
+    start = time.perf_counter()
+
+    stream, to_close = _open_binary(source)
+    try:
+        if not _skip_header(stream):
+            return
+        reader = pd.read_csv(
+            stream,
+            sep="\t",
+            header=None,
+            usecols=usecols,
+            dtype=dtype,
+            na_filter=False,
+            quoting=csv.QUOTE_NONE,
+            chunksize=chunksize,
+            engine="c",
+        )
+        for chunk in reader:
+            chunk.columns = names
+            stats["records"] += len(chunk)
+            if split_alleles:
+                chunk = split_multiallelic(chunk)
+            stats["rows"] += len(chunk)
+            stats["chunks"] += 1
+            yield chunk[columns]
+    finally:
+        for handle in to_close:
+            handle.close()
+        elapsed = time.perf_counter() - start
+        stats["seconds"] = elapsed
+        stats["records_per_sec"] = stats["records"] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Parsed {stats['records']} VCF records ({stats['rows']} rows) "
+            f"in {elapsed:.2f}s ({stats['records_per_sec']:.0f} records/s)"
+        )
+
+
+def read_vcf(source, columns=None, chunksize=DEFAULT_CHUNKSIZE, split_alleles=True):
+    """
+    Tüm VCF'i parça parça okuyup tek bir DataFrame döndürür.
+    Okuma istatistikleri `df.attrs["parse_stats"]` altında saklanır.
+    """
+    stats = {}
+    chunks = list(iter_vcf_chunks(source, columns, chunksize, split_alleles, stats))
+    if chunks:
+        df = pd.concat(chunks, ignore_index=True)
+    else:
+        df = pd.DataFrame({c: pd.Series(dtype="int64" if c == "POS" else object)
+                           for c in (columns or DEFAULT_COLUMNS)})
+    df.attrs["parse_stats"] = stats
+    return df